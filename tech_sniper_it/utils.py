@@ -103,7 +103,7 @@ def decode_json_dict_maybe_base64(raw_value: str | None) -> tuple[dict[str, Any]
     if raw.startswith("{"):
         return _parse_json_dict(raw)
 
-    compact = re.sub(r"\s+", "", raw)
+    compact = "".join(raw.split())
     variants = [compact]
     padding = (-len(compact)) % 4
     if padding:
@@ -158,7 +158,8 @@ def infer_amazon_warehouse_condition(text: str | None) -> tuple[str | None, floa
     if not lowered:
         return None, 0.0, False
 
-    normalized = re.sub(r"\s+", " ", lowered)
+    # str.split() drops the same Unicode whitespace as \s+ without a regex pass.
+    normalized = " ".join(lowered.split())
     packaging_only = any(marker in normalized for marker in AMAZON_PACKAGING_ONLY_HINTS)
 
     for label, tokens, confidence in AMAZON_CONDITION_PATTERNS:
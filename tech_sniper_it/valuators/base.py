@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import re
 import time
@@ -84,8 +85,30 @@ class BaseValuator(ABC):
             except PlaywrightError:
                 continue
 
+    async def _present_selectors(self, page: Page, selectors: list[str]) -> list[str]:
+        # Probe every selector concurrently (one round-trip cluster instead of one per selector);
+        # keeps input order and treats probe errors as "not present".
+        counts = await asyncio.gather(
+            *(page.locator(selector).first.count() for selector in selectors),
+            return_exceptions=True,
+        )
+        return [
+            selector
+            for selector, count in zip(selectors, counts)
+            if isinstance(count, int) and not isinstance(count, bool) and count > 0
+        ]
+
+    async def _present_selectors_first(self, page: Page, selectors: list[str]) -> list[str]:
+        # Selectors already in the DOM are tried first, so absent ones no longer cost a full
+        # visibility timeout each before a present one is reached.
+        present = await self._present_selectors(page, selectors)
+        if not present:
+            return list(selectors)
+        present_set = set(present)
+        return present + [selector for selector in selectors if selector not in present_set]
+
     async def _click_first(self, page: Page, selectors: list[str], timeout_ms: int = 5000) -> bool:
-        for selector in selectors:
+        for selector in await self._present_selectors_first(page, selectors):
             try:
                 locator = page.locator(selector).first
                 await locator.wait_for(state="visible", timeout=timeout_ms)
@@ -96,7 +119,7 @@ class BaseValuator(ABC):
         return False
 
     async def _fill_first(self, page: Page, selectors: list[str], value: str, timeout_ms: int = 5000) -> bool:
-        for selector in selectors:
+        for selector in await self._present_selectors_first(page, selectors):
             try:
                 locator = page.locator(selector).first
                 await locator.wait_for(state="visible", timeout=timeout_ms)
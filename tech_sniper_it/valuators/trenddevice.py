@@ -1,20 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import atexit
+import heapq
+import importlib.util
 import json
 import os
 import random
 import re
+import sys
 import tempfile
 import time
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass, field
 from difflib import SequenceMatcher
-from typing import Any
-from urllib import error as urllib_error
-from urllib import request as urllib_request
-from urllib.parse import urlparse
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from urllib.parse import ParseResult, urlparse
 
+import httpx
 from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
 from playwright.async_api import Error as PlaywrightError
 from playwright.async_api import Page
 from playwright.async_api import async_playwright
@@ -23,6 +30,11 @@ from tech_sniper_it.models import AmazonProduct, ProductCategory
 from tech_sniper_it.utils import decode_json_dict_maybe_base64, detect_color_variants, extract_capacity_gb, parse_eur_price
 from tech_sniper_it.valuators.base import BaseValuator, ValuatorRuntimeError
 
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib codec is the fallback
+    orjson = None
+
 
 STEP_DEVICE_FAMILY = "device_family"
 STEP_MODEL = "model"
@@ -33,6 +45,8 @@ STEP_SIM = "sim"
 STEP_MARKET = "market"
 STEP_COLOR = "color"
 STEP_YES_NO = "yes_no"
+# Final steps where a stagnant option list usually means a "Valuta" button must be clicked.
+WIZARD_FINALIZE_STEPS: frozenset[str] = frozenset({STEP_MARKET, STEP_COLOR, STEP_YES_NO})
 
 COLOR_HINTS: tuple[str, ...] = (
     "nero",
@@ -51,6 +65,25 @@ COLOR_HINTS: tuple[str, ...] = (
     "siderale",
     "mezzanotte",
 )
+CONDITION_STEP_HINTS: tuple[str, ...] = (
+    "normale usura",
+    "perfetto",
+    "accettabile",
+    "danneggiato",
+    "non funzionante",
+    "ottimo",
+    "come nuovo",
+)
+SIM_STEP_HINTS: tuple[str, ...] = ("sim card", "e sim", "esim")
+COLOR_HINT_PATTERN = re.compile("|".join(re.escape(hint) for hint in COLOR_HINTS))
+CONDITION_STEP_HINT_PATTERN = re.compile("|".join(re.escape(hint) for hint in CONDITION_STEP_HINTS))
+SIM_STEP_HINT_PATTERN = re.compile("|".join(re.escape(hint) for hint in SIM_STEP_HINTS))
+WIZARD_YES_NO_VALUES: frozenset[str] = frozenset({"si", "no"})
+WIZARD_FAMILY_MARKERS: frozenset[str] = frozenset(
+    {"iphone", "ipad", "apple watch", "watch", "garmin", "mac", "macbook", "samsung", "google"}
+)
+# Options that, next to "iphone", reveal the device-family step.
+WIZARD_FAMILY_PEERS: frozenset[str] = frozenset({"ipad", "apple watch", "watch", "samsung", "google", "garmin"})
 CONDITION_PREFERENCE: tuple[str, ...] = (
     "normale usura",
     "perfetto",
@@ -113,6 +146,10 @@ NETWORK_PRICE_KEYS: tuple[str, ...] = (
     "cash",
     "payout",
 )
+NETWORK_KEYED_PRICE_PATTERNS: tuple[tuple[str, re.Pattern[str]], ...] = tuple(
+    (keyword, re.compile(rf"{re.escape(keyword)}[^0-9€]{{0,40}}(\d{{2,5}}(?:[.,]\d{{1,2}})?)\s*€?", re.IGNORECASE))
+    for keyword in NETWORK_PRICE_KEYS
+)
 NETWORK_PROMO_BLOCKERS: tuple[str, ...] = (
     "fino al",
     "fino a",
@@ -125,6 +162,26 @@ NETWORK_PROMO_BLOCKERS: tuple[str, ...] = (
     "reso gratis",
     "rate",
 )
+# JSON candidates need stronger quote context than a bare "price" key: payloads can carry whole catalog price lists.
+NETWORK_JSON_STRONG_TERMS: tuple[str, ...] = (
+    "valuation",
+    "valutazione",
+    "quote",
+    "quotazione",
+    "offerta",
+    "offer",
+    "cash",
+    "payout",
+    "amount",
+    "totale",
+    "ti offriamo",
+    "ricevi",
+    "paghiamo",
+)
+NETWORK_VALUATION_TERMS: tuple[str, ...] = ("ti offriamo", "valutazione", "ricevi", "paghiamo", "quotazione", "offerta")
+NETWORK_PROMO_BLOCKER_PATTERN = re.compile("|".join(re.escape(term) for term in NETWORK_PROMO_BLOCKERS))
+NETWORK_JSON_STRONG_TERM_PATTERN = re.compile("|".join(re.escape(term) for term in NETWORK_JSON_STRONG_TERMS))
+NETWORK_VALUATION_TERM_PATTERN = re.compile("|".join(re.escape(term) for term in NETWORK_VALUATION_TERMS))
 MATCH_STOPWORDS: set[str] = {
     "apple",
     "amazon",
@@ -208,8 +265,84 @@ ANCHOR_TOKENS: tuple[str, ...] = (
     "macbook",
 )
 CAPACITY_TOKEN_PATTERN = re.compile(r"\b\d{2,4}\s*(?:gb|tb)\b", re.IGNORECASE)
+NETWORK_INTERESTING_URL_PATTERN = re.compile(r"valut|offer|quote|quotazione|/api/|graphql|vendi")
+NETWORK_TEXTUAL_CONTENT_TYPE_PATTERN = re.compile(r"json|text|javascript")
+WIZARD_TEXT_CACHE_MAX_LENGTH = 256
+PLAIN_PRICE_CACHE_MAX_LENGTH = 64
+WIZARD_TEXT_ALLOWED_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789%+<>= "
+
+
+# bytes.translate table: allowed ASCII maps to itself, every other byte to a space. Non-ASCII code
+# points are first encoded as "?" (one byte each), so they become spaces too and offsets are kept.
+WIZARD_TEXT_TRANSLATION = bytes(code if chr(code) in WIZARD_TEXT_ALLOWED_CHARS else 32 for code in range(256))
+CAPACITY_STEP_PATTERN = re.compile(r"\b\d{2,4}\s*gb\b|\b\d+\s*tb\b")
+IPHONE_MODEL_HINT_PATTERN = re.compile(
+    r"\biphone\s+(?P<base>\d{1,2}|se(?:\s+\d{4})?)\s*(?P<variant>pro max|pro|plus|mini|air|e)?"
+)
+MODEL_NUMBER_PATTERN = re.compile(r"\b\d{1,2}\b")
+CONTEXTUAL_PRICE_PATTERN = re.compile(r"\d{1,3}(?:[.\s]\d{3})*(?:,\d{2})?\s*€")
+WATCH_SERIES_PATTERNS: tuple[re.Pattern[str], ...] = (
+    re.compile(r"\b(?:serie|series)\s*(\d{1,2})\b"),
+    re.compile(r"\b(\d{1,2})\s*(?:serie|series)\b"),
+)
+WATCH_ULTRA_PATTERN = re.compile(r"\bultra\s*(\d{1,2})\b")
+WATCH_INTENT_TERMS: tuple[str, ...] = ("watch", "garmin", "fenix", "epix", "forerunner")
+WATCH_FAMILY_TARGETS: frozenset[str] = frozenset({"watch", "apple watch", "garmin", "fenix", "epix"})
+# lxml builds the same soup several times faster than the stdlib parser; it is optional, not a requirement.
+HTML_PARSER_FEATURES = "lxml" if builder_registry.lookup("lxml") is not None else "html.parser"
+# Character references the parsers decode to "€" (HTML5 maps &#128; to the euro sign too).
+EURO_ENTITY_PATTERN = re.compile(r"&(?:euro|#0*(?:8364|128)(?!\d)|#x0*(?:20ac|80)(?![0-9a-f]))", re.IGNORECASE)
+# innerText of the first `limit` matches, null for hidden ones (same visibility rule as Locator.is_visible).
+WIZARD_OPTION_ROWS_SCRIPT = """(nodes, limit) => nodes.slice(0, limit).map((node) => {
+    const rect = node.getBoundingClientRect();
+    const style = window.getComputedStyle(node);
+    if (!rect.width || !rect.height || style.visibility === "hidden") return null;
+    return node.innerText || "";
+})"""
+SCRIPT_QUOTE_TERMS: tuple[str, ...] = ("valutazione", "quote", "offerta", "ti offriamo", "ricevi")
+SCRIPT_QUOTE_TERM_PATTERN = re.compile("|".join(re.escape(term) for term in SCRIPT_QUOTE_TERMS))
+# Same terms on raw script text; the gap accepts anything normalization would turn into a single space.
+SCRIPT_QUOTE_RAW_PATTERN = re.compile(r"valutazione|quote|offerta|ricevi|ti[^a-z0-9%+<>=]+offriamo", re.IGNORECASE)
+NETWORK_SOURCE_CONTEXT = "context"
+NETWORK_SOURCE_KEYWORD = "keyword"
+NETWORK_SOURCE_JSON = "json"
+NETWORK_SKIPPED_RESOURCE_TYPES: frozenset[str] = frozenset({"image", "font", "stylesheet", "media"})
+BLOCKED_RESOURCE_TYPES: frozenset[str] = frozenset({"image", "font", "media"})
+NETWORK_SKIPPED_CONTENT_TYPES: tuple[str, ...] = ("image/", "font/", "text/css", "video/", "audio/")
+# Declared bodies above this are bundles/catalog dumps; quotes are small XHR payloads.
+NETWORK_MAX_CAPTURE_BYTES = 200_000
+NETWORK_CANDIDATES_LIMIT = 40
+QUOTE_WAIT_POLL_MS = 250
+QUOTE_RENDER_GRACE_MS = 400
+PROFILE_READY_MARKER = ".tech_sniper_ready"
+NETWORK_SCAN_MAX_BYTES = 120_000
+JSON_DOCUMENT_START_PATTERN = re.compile(rb"\s*[\[{]")
+RESPONSE_BODY_CACHE_SIZE = 128
+RESPONSE_CAPTURE_WORKERS = 4
+RESPONSE_CAPTURE_QUEUE_SIZE = 256
 _TRENDDEVICE_STORAGE_STATE_ERROR = ""
+# (raw env blob, materialized path): the decoded storage state is written once per process.
+_TRENDDEVICE_STORAGE_STATE_FILE: tuple[str, str] | None = None
+# Files of rotated blobs: a valuation started before the rotation may still hand them to new_context.
+_TRENDDEVICE_RETIRED_STORAGE_STATE_FILES: list[str] = []
 _TRENDDEVICE_DEFAULT_API_BASE_URL = "https://0lpt5fe6f2.execute-api.eu-south-1.amazonaws.com/prod"
+_TRENDDEVICE_API_TOTAL_BUDGET_SECONDS = 45.0
+_TRENDDEVICE_API_MIN_REQUEST_SECONDS = 2.0
+_TRENDDEVICE_API_HEADERS: dict[str, str] = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/json, text/plain, */*",
+}
+# AsyncClient pools are bound to the loop that opened them: (loop, client).
+_TRENDDEVICE_API_CLIENT: tuple[asyncio.AbstractEventLoop, httpx.AsyncClient] | None = None
+# HTTP/2 multiplexes the probe's requests on one TLS connection; it needs the optional h2 package.
+_TRENDDEVICE_API_HTTP2 = importlib.util.find_spec("h2") is not None
+_TRENDDEVICE_API_CATALOG_TTL_SECONDS = 600.0
+# base_url -> (expires_at, [(normalized_name, device_row)], device_count)
+_TRENDDEVICE_API_CATALOG_CACHE: dict[str, tuple[float, list[tuple[str, dict[str, Any]]], int]] = {}
+_TRENDDEVICE_SHARED_BROWSERS: dict[Any, dict[str, Any]] = {}
 
 
 def _env_or_default(name: str, default: str) -> str:
@@ -219,6 +352,19 @@ def _env_or_default(name: str, default: str) -> str:
     return default
 
 
+def _block_media_enabled() -> bool:
+    value = _env_or_default("TRENDDEVICE_BLOCK_MEDIA", "false").lower()
+    return value in {"1", "true", "yes", "on"}
+
+
+async def _abort_heavy_asset(route: Any) -> None:
+    # Stylesheets stay: option visibility is read from the rendered layout.
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
 def _use_storage_state() -> bool:
     value = _env_or_default("TRENDDEVICE_USE_STORAGE_STATE", "true").lower()
     return value not in {"0", "false", "no", "off"}
@@ -233,6 +379,10 @@ def _load_storage_state_b64() -> str | None:
     if not raw:
         _TRENDDEVICE_STORAGE_STATE_ERROR = "empty"
         return None
+    global _TRENDDEVICE_STORAGE_STATE_FILE
+    cached = _TRENDDEVICE_STORAGE_STATE_FILE
+    if cached is not None and cached[0] == raw and os.path.isfile(cached[1]):
+        return cached[1]
     parsed, error = decode_json_dict_maybe_base64(raw)
     if not parsed:
         _TRENDDEVICE_STORAGE_STATE_ERROR = str(error or "invalid-base64-json")
@@ -241,9 +391,52 @@ def _load_storage_state_b64() -> str | None:
     try:
         json.dump(parsed, handle, ensure_ascii=False)
         handle.flush()
-        return handle.name
     finally:
         handle.close()
+    # No await between the check and the swap, so concurrent valuations on the loop cannot race here.
+    if cached is not None:
+        _TRENDDEVICE_RETIRED_STORAGE_STATE_FILES.append(cached[1])
+    _TRENDDEVICE_STORAGE_STATE_FILE = (raw, handle.name)
+    return handle.name
+
+
+def _remove_storage_state_file() -> None:
+    global _TRENDDEVICE_STORAGE_STATE_FILE
+    if _TRENDDEVICE_STORAGE_STATE_FILE is not None:
+        _remove_file_if_exists(_TRENDDEVICE_STORAGE_STATE_FILE[1])
+        _TRENDDEVICE_STORAGE_STATE_FILE = None
+    while _TRENDDEVICE_RETIRED_STORAGE_STATE_FILES:
+        _remove_file_if_exists(_TRENDDEVICE_RETIRED_STORAGE_STATE_FILES.pop())
+
+
+atexit.register(_remove_storage_state_file)
+
+
+def _session_state_path() -> str | None:
+    # Opt-in: the saved state holds session cookies, so it is only written to a path the operator chose.
+    if not _use_storage_state():
+        return None
+    return (os.getenv("TRENDDEVICE_SESSION_STATE_PATH") or "").strip() or None
+
+
+async def _save_session_state(context: Any, path: str) -> None:
+    # Persist cookies/localStorage (cookie consent included) so the next run can skip the banner.
+    # The temp file is created 0600 (mkstemp) and os.replace keeps that mode on the target.
+    try:
+        state = await context.storage_state()
+    except Exception:
+        return
+    if not isinstance(state, dict):
+        return
+    handle = None
+    try:
+        directory = os.path.dirname(path) or "."
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".json", delete=False, encoding="utf-8") as handle:
+            json.dump(state, handle, ensure_ascii=False)
+        os.replace(handle.name, path)
+    except Exception:
+        if handle is not None:
+            _remove_file_if_exists(handle.name)
 
 
 def _remove_file_if_exists(path: str | None) -> None:
@@ -257,6 +450,199 @@ def _remove_file_if_exists(path: str | None) -> None:
         return
 
 
+def _shared_browser_idle_seconds() -> float:
+    raw = (_env_or_default("TRENDDEVICE_BROWSER_IDLE_SECONDS", "30") or "").strip()
+    try:
+        value = float(raw) if raw else 30.0
+    except ValueError:
+        value = 30.0
+    return max(0.0, min(value, 600.0))
+
+
+async def _close_shared_entry(entry: dict[str, Any]) -> None:
+    async with entry["lock"]:
+        if entry["users"] > 0:
+            return
+        idle_manager, idle_browser = entry["manager"], entry["browser"]
+        entry["manager"] = None
+        entry["browser"] = None
+    if idle_browser is not None:
+        try:
+            await idle_browser.close()
+        except Exception:
+            pass
+    if idle_manager is not None:
+        # Shutdown runs from the worker's finally and from cancelled idle tasks: a driver
+        # failure here must not replace the caller's exit code or exception.
+        try:
+            await idle_manager.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+
+async def _close_shared_entry_after(entry: dict[str, Any], delay: float) -> None:
+    # Sequential valuations reuse the warm browser within the grace period. A new user cancels
+    # this task; when the loop itself is shutting down the browser is still closed on the way out.
+    try:
+        await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        if entry["users"] <= 0:
+            await _close_shared_entry(entry)
+        raise
+    await _close_shared_entry(entry)
+
+
+def _shared_handle_alive(entry: dict[str, Any]) -> bool:
+    handle = entry["browser"]
+    if handle is None:
+        return False
+    is_connected = getattr(handle, "is_connected", None)
+    if callable(is_connected):
+        return bool(is_connected())
+    # A persistent BrowserContext has no browser handle to ask; its "close" event flags it instead.
+    return not entry["closed"]
+
+
+@asynccontextmanager
+async def _shared_playwright_handle(
+    key: Any,
+    launch: Callable[[Any], Awaitable[Any]],
+) -> AsyncIterator[Any]:
+    # Concurrent valuations (manager fan-out) share one launched handle; it stays warm for a short
+    # idle grace after the last user.
+    loop = asyncio.get_running_loop()
+    entry = _TRENDDEVICE_SHARED_BROWSERS.get(key)
+    if entry is None or entry["loop"] is not loop:
+        entry = {
+            "loop": loop,
+            "lock": asyncio.Lock(),
+            "users": 0,
+            "manager": None,
+            "browser": None,
+            "closed": False,
+            "idle_task": None,
+        }
+        _TRENDDEVICE_SHARED_BROWSERS[key] = entry
+    async with entry["lock"]:
+        idle_task = entry["idle_task"]
+        entry["idle_task"] = None
+        if idle_task is not None:
+            idle_task.cancel()
+        if not _shared_handle_alive(entry):
+            manager = async_playwright()
+            playwright = await manager.__aenter__()
+            try:
+                handle = await launch(playwright)
+            except BaseException:
+                try:
+                    await manager.__aexit__(None, None, None)
+                except Exception:
+                    pass
+                raise
+            entry["manager"] = manager
+            entry["browser"] = handle
+            entry["closed"] = False
+            if not callable(getattr(handle, "is_connected", None)):
+                handle.on("close", lambda _context: entry.__setitem__("closed", True))
+        handle = entry["browser"]
+        entry["users"] += 1
+    try:
+        yield handle
+    finally:
+        idle = False
+        async with entry["lock"]:
+            entry["users"] -= 1
+            idle = entry["users"] <= 0
+        if idle:
+            delay = _shared_browser_idle_seconds()
+            if delay <= 0:
+                await _close_shared_entry(entry)
+            else:
+                entry["idle_task"] = loop.create_task(_close_shared_entry_after(entry, delay))
+
+
+def _shared_chromium(*, headless: bool) -> AbstractAsyncContextManager[Any]:
+    # Each valuation opens its own isolated BrowserContext on the shared browser.
+    return _shared_playwright_handle(headless, lambda playwright: playwright.chromium.launch(headless=headless))
+
+
+def _shared_persistent_context(*, headless: bool, user_data_dir: str) -> AbstractAsyncContextManager[Any]:
+    # One profile directory can only be opened once, so valuations share the context and open a page each.
+    return _shared_playwright_handle(
+        ("persistent", headless, user_data_dir),
+        lambda playwright: playwright.chromium.launch_persistent_context(
+            user_data_dir,
+            headless=headless,
+            locale="it-IT",
+        ),
+    )
+
+
+def _persistent_profile_dir() -> str | None:
+    value = _env_or_default("TRENDDEVICE_PERSISTENT_PROFILE", "false").lower()
+    if value not in {"1", "true", "yes", "on"}:
+        return None
+    default = os.path.join(tempfile.gettempdir(), "tech_sniper_trenddevice_profile")
+    return _env_or_default("TRENDDEVICE_PROFILE_DIR", default)
+
+
+def _profile_session_ready(profile_dir: str) -> bool:
+    return os.path.isfile(os.path.join(profile_dir, PROFILE_READY_MARKER))
+
+
+def _mark_profile_session(profile_dir: str, ready: bool) -> None:
+    # Chromium writes the profile on its own; the marker records whether the last run ended with a quote.
+    marker = os.path.join(profile_dir, PROFILE_READY_MARKER)
+    if not ready:
+        _remove_file_if_exists(marker)
+        return
+    try:
+        with open(marker, "w", encoding="utf-8"):
+            pass
+    except OSError:
+        return
+
+
+async def close_shared_chromium() -> None:
+    # Explicit shutdown for callers that do not want to wait out the idle grace.
+    loop = asyncio.get_running_loop()
+    for entry in list(_TRENDDEVICE_SHARED_BROWSERS.values()):
+        if entry["loop"] is not loop:
+            continue
+        idle_task = entry["idle_task"]
+        entry["idle_task"] = None
+        if idle_task is not None:
+            idle_task.cancel()
+        await _close_shared_entry(entry)
+
+
+def _json_loads(raw: str | bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity literals and >64-bit integers are valid for the stdlib parser only.
+            pass
+    return json.loads(raw)
+
+
+def _json_loads_body(content: bytes) -> Any:
+    # Parse the wire bytes directly; only a body with stray invalid UTF-8 pays for a lenient decode.
+    try:
+        return _json_loads(content)
+    except UnicodeDecodeError:
+        return _json_loads(content.decode("utf-8", errors="ignore"))
+
+
+def _json_dumps_bytes(payload: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            pass
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
 def _trenddevice_api_enabled() -> bool:
     raw = _env_or_default("TRENDDEVICE_API_ENABLED", "true").lower()
     return raw not in {"0", "false", "no", "off"}
@@ -275,6 +661,13 @@ def _trenddevice_api_timeout_seconds() -> float:
     return max(5.0, min(value, 60.0))
 
 
+def _trenddevice_api_request_budget(deadline: float, timeout_seconds: float) -> float | None:
+    remaining = deadline - time.monotonic()
+    if remaining < _TRENDDEVICE_API_MIN_REQUEST_SECONDS:
+        return None
+    return min(timeout_seconds, remaining)
+
+
 def _trenddevice_api_email_candidates() -> list[str]:
     raw = (os.getenv("TRENDDEVICE_LEAD_EMAIL") or "").strip()
     candidates: list[str] = []
@@ -288,57 +681,79 @@ def _trenddevice_api_email_candidates() -> list[str]:
     candidates.append(f"techsniperit{ts}@gmail.com")
     candidates.append(f"techsniperit{ts}@outlook.com")
     unique: list[str] = []
+    seen: set[str] = set()
     for value in candidates:
         marker = value.casefold()
-        if marker not in {item.casefold() for item in unique}:
+        if marker not in seen:
+            seen.add(marker)
             unique.append(value)
     return unique[:4]
 
 
-def _trenddevice_api_request_json(
+def _trenddevice_api_client() -> httpx.AsyncClient:
+    # One keep-alive pool for every API call: a valuation makes 3-10 requests to the same host,
+    # and consecutive products reuse the warm TLS connections.
+    global _TRENDDEVICE_API_CLIENT
+    loop = asyncio.get_running_loop()
+    current = _TRENDDEVICE_API_CLIENT
+    if current is not None and current[0] is loop and not current[1].is_closed:
+        return current[1]
+    client = httpx.AsyncClient(
+        follow_redirects=True,
+        http2=_TRENDDEVICE_API_HTTP2,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=60.0),
+    )
+    _TRENDDEVICE_API_CLIENT = (loop, client)
+    return client
+
+
+async def close_trenddevice_api_client() -> None:
+    global _TRENDDEVICE_API_CLIENT
+    current = _TRENDDEVICE_API_CLIENT
+    _TRENDDEVICE_API_CLIENT = None
+    if current is not None and current[0] is asyncio.get_running_loop():
+        await current[1].aclose()
+
+
+async def _trenddevice_api_request_json(
     *,
     method: str,
     path: str,
     payload: dict[str, Any] | None = None,
     timeout_seconds: float,
+    base_url: str | None = None,
 ) -> tuple[Any | None, dict[str, Any]]:
-    url = f"{_trenddevice_api_base_url()}/{path.lstrip('/')}"
+    url = f"{base_url or _trenddevice_api_base_url()}/{path.lstrip('/')}"
     body: bytes | None = None
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-        ),
-        "Accept": "application/json, text/plain, */*",
-    }
+    headers = dict(_TRENDDEVICE_API_HEADERS)
     if payload is not None:
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        body = _json_dumps_bytes(payload)
         headers["Content-Type"] = "application/json"
-    request = urllib_request.Request(
-        url,
-        data=body,
-        method=method.upper(),
-        headers=headers,
-    )
     try:
-        with urllib_request.urlopen(request, timeout=timeout_seconds) as response:
-            status = int(getattr(response, "status", 200) or 200)
-            raw = response.read().decode("utf-8", errors="ignore")
-        parsed = json.loads(raw) if raw else None
-        return parsed, {"ok": True, "status": status, "url": url}
-    except urllib_error.HTTPError as exc:
-        try:
-            raw = exc.read().decode("utf-8", errors="ignore")
-        except Exception:
-            raw = ""
-        details: dict[str, Any] = {"ok": False, "status": int(exc.code), "url": url, "raw": raw[:400]}
+        response = await _trenddevice_api_client().request(
+            method.upper(),
+            url,
+            content=body,
+            headers=headers,
+            timeout=timeout_seconds,
+        )
+        content = response.content
+    except Exception as exc:
+        return None, {"ok": False, "status": None, "url": url, "error": str(exc)}
+    status = int(response.status_code)
+    if status >= 400:
+        raw = content[:1600].decode("utf-8", errors="ignore")[:400]
+        details: dict[str, Any] = {"ok": False, "status": status, "url": url, "raw": raw}
         try:
-            details["json"] = json.loads(raw) if raw else None
+            details["json"] = _json_loads_body(content) if content else None
         except Exception:
             details["json"] = None
         return None, details
+    try:
+        parsed = _json_loads_body(content) if content else None
     except Exception as exc:
         return None, {"ok": False, "status": None, "url": url, "error": str(exc)}
+    return parsed, {"ok": True, "status": status, "url": url}
 
 
 def _trenddevice_api_label_text(characteristic: dict[str, Any]) -> str:
@@ -385,26 +800,45 @@ def _trenddevice_api_step_type(characteristic: dict[str, Any], options: list[Wiz
     return _detect_wizard_step(options)
 
 
+def _trenddevice_api_device_index(devices: list[Any]) -> list[tuple[str, dict[str, Any]]]:
+    index: list[tuple[str, dict[str, Any]]] = []
+    for row in devices:
+        if not isinstance(row, dict):
+            continue
+        models = row.get("models")
+        if not isinstance(models, list) or not models:
+            continue
+        name = _normalize_wizard_text(str(row.get("nome") or ""))
+        if name:
+            index.append((name, row))
+    return index
+
+
 def _trenddevice_api_pick_device(
     *,
     devices: list[dict[str, Any]],
     product: AmazonProduct,
     normalized_name: str,
+) -> dict[str, Any] | None:
+    return _trenddevice_api_pick_indexed_device(
+        device_index=_trenddevice_api_device_index(devices),
+        product=product,
+        normalized_name=normalized_name,
+    )
+
+
+def _trenddevice_api_pick_indexed_device(
+    *,
+    device_index: list[tuple[str, dict[str, Any]]],
+    product: AmazonProduct,
+    normalized_name: str,
 ) -> dict[str, Any] | None:
     targets = _infer_family_targets(product, normalized_name)
     query = _normalize_wizard_text(f"{product.title} {normalized_name}")
     best_row: dict[str, Any] | None = None
     best_score = -10_000
-    for row in devices:
-        if not isinstance(row, dict):
-            continue
-        models = row.get("models")
-        if not isinstance(models, list) or not models:
-            continue
-        name = _normalize_wizard_text(str(row.get("nome") or ""))
-        if not name:
-            continue
-        score = int(SequenceMatcher(None, query, name).ratio() * 30)
+    for name, row in device_index:
+        score = 0
         for target in targets:
             if target and target in name:
                 score += 110
@@ -419,6 +853,14 @@ def _trenddevice_api_pick_device(
             score += 80
         if "watch" in query and "watch" in name:
             score += 80
+        # The similarity term adds at most 30: skip the matcher for rows that cannot take the lead,
+        # then bound it with quick_ratio() before paying for the full ratio().
+        if score + 30 <= best_score:
+            continue
+        matcher = SequenceMatcher(None, query, name)
+        if score + int(matcher.quick_ratio() * 30) <= best_score:
+            continue
+        score += int(matcher.ratio() * 30)
         if score > best_score:
             best_row = row
             best_score = score
@@ -433,7 +875,10 @@ def _trenddevice_api_pick_model(
     if not models:
         return None
     model_hint = _extract_iphone_model_hint(normalized_name)
-    ranked: list[tuple[int, dict[str, Any]]] = []
+    matcher = _model_score_matcher(model_hint=model_hint, normalized_name=normalized_name)
+    # Running best with strict ">" keeps the first of equal scores, like max() over a ranked list.
+    best_row: dict[str, Any] | None = None
+    best_score: int | None = None
     for index, row in enumerate(models):
         if not isinstance(row, dict):
             continue
@@ -441,12 +886,13 @@ def _trenddevice_api_pick_model(
         if not name:
             continue
         option = WizardOption(index=index, text=name, normalized=_normalize_wizard_text(name))
-        score = _model_score(option, model_hint=model_hint, normalized_name=normalized_name)
-        ranked.append((score, row))
-    if not ranked:
-        return None
-    ranked.sort(key=lambda item: item[0], reverse=True)
-    return ranked[0][1]
+        score = _model_score(
+            option, model_hint=model_hint, normalized_name=normalized_name, matcher=matcher, floor=best_score
+        )
+        if best_score is None or score > best_score:
+            best_row = row
+            best_score = score
+    return best_row
 
 
 def _trenddevice_api_extract_stima(data: Any) -> float | None:
@@ -474,99 +920,171 @@ class WizardOption:
     selector: str = "label:has(input[name='item'])"
 
 
-def _normalize_wizard_text(value: str | None) -> str:
-    lowered = (value or "").strip().lower()
-    lowered = lowered.replace("’", "'")
-    lowered = re.sub(r"\s+", " ", lowered)
-    lowered = re.sub(r"[^a-z0-9%+<>= ]", " ", lowered)
-    lowered = re.sub(r"\s+", " ", lowered).strip()
-    return lowered
-
+@dataclass(slots=True)
+class WizardContext:
+    # Per-product inputs of the wizard pickers, derived once instead of on every step.
+    normalized_name: str
+    model_hint: str
+    family_targets: list[str]
+    capacity: str
+    combined: str
+    color_targets: tuple[str, ...]
+
+    @classmethod
+    def build(cls, product: AmazonProduct, normalized_name: str) -> WizardContext:
+        raw_combined = f"{product.title} {normalized_name}"
+        return cls(
+            normalized_name=normalized_name,
+            model_hint=_extract_iphone_model_hint(normalized_name),
+            family_targets=_infer_family_targets(product, normalized_name),
+            capacity=_normalize_wizard_text(extract_capacity_gb(normalized_name)),
+            combined=_normalize_wizard_text(raw_combined),
+            color_targets=tuple(
+                target for target in map(_normalize_wizard_text, detect_color_variants(raw_combined)) if target
+            ),
+        )
 
-def _options_signature(options: list[WizardOption]) -> str:
-    return "|".join(item.normalized for item in options)
 
+@dataclass(slots=True)
+class NetworkPriceCandidate:
+    score: int
+    value: float
+    snippet: str
+    source: str
+    url: str = ""
+    status: int | None = None
+    content_type: str = ""
+    wizard_progress: int = 0
+
+    @classmethod
+    def coerce(cls, item: NetworkPriceCandidate | dict[str, Any]) -> NetworkPriceCandidate:
+        if isinstance(item, cls):
+            return item
+        status = item.get("status")
+        return cls(
+            score=int(item.get("score", 0) or 0),
+            value=float(item.get("value", 0.0) or 0.0),
+            snippet=str(item.get("snippet", "") or ""),
+            source=str(item.get("source", "") or ""),
+            url=str(item.get("url", "") or ""),
+            status=int(status) if isinstance(status, int) else None,
+            content_type=str(item.get("content_type", "") or ""),
+            wizard_progress=int(item.get("wizard_progress", 0) or 0),
+        )
 
-def _is_capacity_step(values: list[str]) -> bool:
-    return any(re.search(r"\b\d{2,4}\s*gb\b|\b\d+\s*tb\b", value) for value in values)
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "status": self.status,
+            "content_type": self.content_type,
+            "score": self.score,
+            "value": self.value,
+            "snippet": self.snippet,
+            "source": self.source,
+            "wizard_progress": self.wizard_progress,
+        }
 
 
-def _is_condition_step(values: list[str]) -> bool:
-    hints = ("normale usura", "perfetto", "accettabile", "danneggiato", "non funzionante", "ottimo", "come nuovo")
-    return any(any(hint in value for hint in hints) for value in values)
+def _normalize_wizard_text(value: str | None) -> str:
+    if not value:
+        return ""
+    # Option labels, titles and snippets repeat across steps; page-sized bodies are not worth caching.
+    if len(value) <= WIZARD_TEXT_CACHE_MAX_LENGTH:
+        return _normalize_wizard_text_cached(value)
+    return _normalize_wizard_text_uncached(value)
 
 
-def _is_battery_step(values: list[str]) -> bool:
-    return any("85%" in value for value in values) or any("non originale" in value for value in values)
+@lru_cache(maxsize=4096)
+def _normalize_wizard_text_cached(value: str) -> str:
+    # Short labels recur across steps and candidates: interned copies compare by identity first.
+    return sys.intern(_normalize_wizard_text_uncached(value))
 
 
-def _is_sim_step(values: list[str]) -> bool:
-    return any("sim card" in value or "e sim" in value or "esim" in value for value in values)
+def _normalize_wizard_text_uncached(value: str) -> str:
+    return " ".join(_sanitize_lowered_text(value.lower()).split())
 
 
-def _is_market_step(values: list[str]) -> bool:
-    return any("italia" in value for value in values) and any("estero" in value for value in values)
+def _sanitize_lowered_text(lowered: str) -> str:
+    # Byte-level translate: several times faster than str.translate with a dict table, most of all
+    # on text with non-ASCII characters such as "€".
+    return lowered.encode("ascii", "replace").translate(WIZARD_TEXT_TRANSLATION).decode("ascii")
 
 
-def _is_color_step(values: list[str]) -> bool:
-    matches = sum(1 for value in values if any(color in value for color in COLOR_HINTS))
-    return matches >= max(1, len(values) // 2)
+def _options_signature(options: list[WizardOption]) -> tuple[str, ...]:
+    # A tuple of the (interned) labels: compares element-wise without joining, and doubles as the
+    # step-detection cache key.
+    return tuple(item.normalized for item in options)
 
 
 def _detect_wizard_step(options: list[WizardOption]) -> str:
-    values = [item.normalized for item in options]
+    # Polling and retries classify the same option lists again; the labels alone decide the step.
+    return _detect_wizard_step_for_values(_options_signature(options))
+
+
+@lru_cache(maxsize=512)
+def _detect_wizard_step_for_values(values: tuple[str, ...]) -> str:
     if not values:
         return STEP_MODEL
 
-    if all(value in {"si", "no"} for value in values):
+    # Single pass over the option labels: every step signal is accumulated once, then the
+    # priority ladder below picks the step exactly as the former per-step scans did.
+    # "Any label" signals run once over the joined labels: normalized text never contains "|",
+    # and no hint or capacity pattern can match across it.
+    joined = "|".join(values)
+    has_capacity = CAPACITY_STEP_PATTERN.search(joined) is not None
+    has_condition = CONDITION_STEP_HINT_PATTERN.search(joined) is not None
+    has_battery = "85%" in joined or "non originale" in joined
+    has_sim = SIM_STEP_HINT_PATTERN.search(joined) is not None
+    has_italia = "italia" in joined
+    has_estero = "estero" in joined
+    # Colors need a per-label count, but only once the joined scan finds any color at all.
+    count_colors = COLOR_HINT_PATTERN.search(joined) is not None
+    all_yes_no = True
+    has_iphone = False
+    has_family_peer = False
+    family_hits: list[str] = []
+    color_hits = 0
+    for value in values:
+        if value not in WIZARD_YES_NO_VALUES:
+            all_yes_no = False
+        is_mac = value.startswith("mac")
+        if value == "iphone":
+            has_iphone = True
+        if is_mac or value in WIZARD_FAMILY_PEERS:
+            has_family_peer = True
+        if is_mac or value in WIZARD_FAMILY_MARKERS:
+            family_hits.append(value)
+        if count_colors and COLOR_HINT_PATTERN.search(value):
+            color_hits += 1
+
+    if all_yes_no:
         return STEP_YES_NO
-
-    family_markers = {
-        "iphone",
-        "ipad",
-        "apple watch",
-        "watch",
-        "garmin",
-        "mac",
-        "macbook",
-        "samsung",
-        "google",
-    }
-    family_hits = [
-        value
-        for value in values
-        if value in family_markers or value.startswith("mac")
-    ]
     # "Family" steps are typically short, brand-like options (iphone/ipad/watch/mac/samsung...),
     # not model lists with numbers. We keep detection conservative to avoid misclassifying model steps.
-    if "iphone" in values and any(
-        value in {"ipad", "apple watch", "watch", "samsung", "google", "garmin"} or value.startswith("mac")
-        for value in values
-    ):
+    if has_iphone and has_family_peer:
         return STEP_DEVICE_FAMILY
+    # Repeated labels (e.g. the same family rendered twice) count once.
     if len(set(family_hits)) >= 2 and len(values) <= 15:
         return STEP_DEVICE_FAMILY
-    if _is_capacity_step(values):
+    if has_capacity:
         return STEP_CAPACITY
-    if _is_condition_step(values):
+    if has_condition:
         return STEP_CONDITION
-    if _is_battery_step(values):
+    if has_battery:
         return STEP_BATTERY
-    if _is_sim_step(values):
+    if has_sim:
         return STEP_SIM
-    if _is_market_step(values):
+    if has_italia and has_estero:
         return STEP_MARKET
-    if _is_color_step(values):
+    if color_hits >= max(1, len(values) // 2):
         return STEP_COLOR
     return STEP_MODEL
 
 
+@lru_cache(maxsize=1024)
 def _extract_iphone_model_hint(normalized_name: str) -> str:
     value = _normalize_wizard_text(normalized_name)
-    match = re.search(
-        r"\biphone\s+(?P<base>\d{1,2}|se(?:\s+\d{4})?)\s*(?P<variant>pro max|pro|plus|mini|air|e)?",
-        value,
-    )
+    match = IPHONE_MODEL_HINT_PATTERN.search(value)
     if not match:
         return value
     base = (match.group("base") or "").strip()
@@ -574,7 +1092,8 @@ def _extract_iphone_model_hint(normalized_name: str) -> str:
     return f"{base} {variant}".strip()
 
 
-def _query_tokens(value: str) -> list[str]:
+@lru_cache(maxsize=1024)
+def _query_tokens(value: str) -> tuple[str, ...]:
     normalized = _normalize_wizard_text(value)
     tokens = [item for item in normalized.split(" ") if item]
     ranked: list[str] = []
@@ -584,8 +1103,14 @@ def _query_tokens(value: str) -> list[str]:
         if len(token) < 2:
             continue
         if token not in ranked:
-            ranked.append(token)
-    return ranked
+            ranked.append(sys.intern(token))
+    return tuple(ranked)
+
+
+@lru_cache(maxsize=1024)
+def _query_digit_tokens(value: str) -> tuple[str, ...]:
+    # Tokens are normalized ASCII, so isdigit() matches exactly what \d would.
+    return tuple(token for token in _query_tokens(value) if any(char.isdigit() for char in token))
 
 
 def _capacity_tokens(value: str) -> list[str]:
@@ -598,9 +1123,9 @@ def _infer_family_targets(product: AmazonProduct, normalized_name: str) -> list[
     targets: list[str] = []
 
     def _push(value: str) -> None:
-        normalized_value = _normalize_wizard_text(value)
-        if normalized_value and normalized_value not in targets:
-            targets.append(normalized_value)
+        # Targets are already-normalized literals.
+        if value not in targets:
+            targets.append(value)
 
     if product.category == ProductCategory.APPLE_PHONE:
         _push("iphone")
@@ -634,29 +1159,34 @@ def _pick_device_family_option(
     *,
     product: AmazonProduct,
     normalized_name: str,
+    targets: list[str] | None = None,
 ) -> WizardOption | None:
     if not options:
         return None
-    targets = _infer_family_targets(product, normalized_name)
+    if targets is None:
+        targets = _infer_family_targets(product, normalized_name)
     if not targets:
         return options[0]
 
-    watch_intent = any(item in {"watch", "apple watch", "garmin", "fenix", "epix"} for item in targets)
+    watch_intent = not WATCH_FAMILY_TARGETS.isdisjoint(targets)
     iphone_intent = "iphone" in targets
+    family_matcher = _reference_matcher(" ".join(targets[:2]))
+    target_tokens = [(target, target.split()) for target in targets]
     best: WizardOption | None = None
     best_score = -10_000
     for option in options:
         text = option.normalized
         score = 0
-        for target in targets:
+        for target, tokens in target_tokens:
             if text == target:
                 score += 220
             if target in text:
                 score += 110
-            for token in target.split():
+            for token in tokens:
                 if token in text:
                     score += 28
-        score += int(SequenceMatcher(None, text, " ".join(targets[:2])).ratio() * 35)
+        family_matcher.set_seq1(text)
+        score += int(family_matcher.ratio() * 35)
 
         if watch_intent and "iphone" in text and "watch" not in text and "garmin" not in text:
             score -= 160
@@ -672,12 +1202,32 @@ def _pick_device_family_option(
     return options[0]
 
 
-def _model_score(option: WizardOption, *, model_hint: str, normalized_name: str) -> int:
+def _reference_matcher(reference: str) -> SequenceMatcher:
+    # SequenceMatcher caches its analysis of seq2: when many options are ranked against one
+    # reference, reuse a single matcher and only swap seq1 (same ratio as a fresh matcher).
+    matcher = SequenceMatcher(None)
+    matcher.set_seq2(reference)
+    return matcher
+
+
+def _model_score_matcher(*, model_hint: str, normalized_name: str) -> SequenceMatcher:
+    return _reference_matcher(_normalize_wizard_text(model_hint) or _normalize_wizard_text(normalized_name))
+
+
+def _model_score(
+    option: WizardOption,
+    *,
+    model_hint: str,
+    normalized_name: str,
+    matcher: SequenceMatcher | None = None,
+    floor: int | None = None,
+) -> int:
+    # With `floor` (the best score so far), an option whose similarity upper bound cannot beat it
+    # returns `floor` without the full ratio(); rankers keep the first of equal scores anyway.
     hint = _normalize_wizard_text(model_hint)
-    full_name = _normalize_wizard_text(normalized_name)
     text = option.normalized
 
-    score = int(SequenceMatcher(None, text, hint or full_name).ratio() * 100)
+    score = 0
     if hint and text == hint:
         score += 200
     if hint and text in hint:
@@ -689,7 +1239,7 @@ def _model_score(option: WizardOption, *, model_hint: str, normalized_name: str)
         if token in text:
             score += 25
 
-    number_match = re.search(r"\b\d{1,2}\b", text)
+    number_match = MODEL_NUMBER_PATTERN.search(text)
     if number_match:
         number = number_match.group(0)
         if number in hint:
@@ -703,14 +1253,34 @@ def _model_score(option: WizardOption, *, model_hint: str, normalized_name: str)
         score -= 20
     if "mini" in text and "mini" not in hint:
         score -= 20
-    return score
+
+    # Callers ranking a whole option list pass a prebuilt matcher; the name is only needed without one.
+    if matcher is None:
+        matcher = _model_score_matcher(model_hint=model_hint, normalized_name=normalized_name)
+    matcher.set_seq1(text)
+    if floor is not None and (
+        score + int(matcher.real_quick_ratio() * 100) <= floor or score + int(matcher.quick_ratio() * 100) <= floor
+    ):
+        return floor
+    return score + int(matcher.ratio() * 100)
+
+
+def _normalized_preferences(preferences: tuple[str, ...]) -> tuple[str, ...]:
+    return tuple(normalized for normalized in map(_normalize_wizard_text, preferences) if normalized)
+
+
+# Preference lists normalized once at import instead of on every wizard step.
+CONDITION_PREFERENCE_NORMALIZED = _normalized_preferences(CONDITION_PREFERENCE)
+BATTERY_PREFERENCE_NORMALIZED = _normalized_preferences(BATTERY_PREFERENCE)
+SIM_PREFERENCE_NORMALIZED = _normalized_preferences(SIM_PREFERENCE)
+MARKET_PREFERENCE_NORMALIZED = _normalized_preferences(MARKET_PREFERENCE)
 
 
 def _pick_by_preference(options: list[WizardOption], preferences: tuple[str, ...]) -> WizardOption | None:
-    for preferred in preferences:
-        preferred_norm = _normalize_wizard_text(preferred)
+    # `preferences` must already be normalized (see *_PREFERENCE_NORMALIZED).
+    for preferred_norm in preferences:
         for option in options:
-            if preferred_norm and preferred_norm in option.normalized:
+            if preferred_norm in option.normalized:
                 return option
     return options[0] if options else None
 
@@ -722,28 +1292,40 @@ def _pick_wizard_option(
     product: AmazonProduct,
     normalized_name: str,
     excluded_models: set[str] | None = None,
+    context: WizardContext | None = None,
 ) -> WizardOption | None:
     if not options:
         return None
+    if context is None:
+        context = WizardContext.build(product, normalized_name)
 
     if step == STEP_DEVICE_FAMILY:
-        return _pick_device_family_option(options, product=product, normalized_name=normalized_name)
-
-    if step == STEP_MODEL:
-        model_hint = _extract_iphone_model_hint(normalized_name)
-        ranked = sorted(
+        return _pick_device_family_option(
             options,
-            key=lambda option: _model_score(option, model_hint=model_hint, normalized_name=normalized_name),
-            reverse=True,
+            product=product,
+            normalized_name=normalized_name,
+            targets=context.family_targets,
         )
+
+    if step == STEP_MODEL:
+        model_hint = context.model_hint
+        matcher = _model_score_matcher(model_hint=model_hint, normalized_name=normalized_name)
         excluded = excluded_models or set()
-        for option in ranked:
-            if option.normalized not in excluded:
-                return option
-        return ranked[0] if ranked else None
+        eligible = [option for option in options if option.normalized not in excluded] or options
+        # Strict ">" keeps the first of equal scores, matching the former stable sort.
+        best_option: WizardOption | None = None
+        best_score: int | None = None
+        for option in eligible:
+            score = _model_score(
+                option, model_hint=model_hint, normalized_name=normalized_name, matcher=matcher, floor=best_score
+            )
+            if best_score is None or score > best_score:
+                best_option = option
+                best_score = score
+        return best_option
 
     if step == STEP_CAPACITY:
-        capacity = _normalize_wizard_text(extract_capacity_gb(normalized_name))
+        capacity = context.capacity
         if capacity:
             for option in options:
                 if capacity in option.normalized:
@@ -751,28 +1333,26 @@ def _pick_wizard_option(
         return options[0]
 
     if step == STEP_CONDITION:
-        return _pick_by_preference(options, CONDITION_PREFERENCE)
+        return _pick_by_preference(options, CONDITION_PREFERENCE_NORMALIZED)
 
     if step == STEP_BATTERY:
-        return _pick_by_preference(options, BATTERY_PREFERENCE)
+        return _pick_by_preference(options, BATTERY_PREFERENCE_NORMALIZED)
 
     if step == STEP_SIM:
-        combined = _normalize_wizard_text(f"{product.title} {normalized_name}")
+        combined = context.combined
         if "esim" in combined or "e sim" in combined:
             for option in options:
                 if "e sim" in option.normalized or "esim" in option.normalized:
                     return option
-        return _pick_by_preference(options, SIM_PREFERENCE)
+        return _pick_by_preference(options, SIM_PREFERENCE_NORMALIZED)
 
     if step == STEP_MARKET:
-        return _pick_by_preference(options, MARKET_PREFERENCE)
+        return _pick_by_preference(options, MARKET_PREFERENCE_NORMALIZED)
 
     if step == STEP_COLOR:
-        variants = detect_color_variants(f"{product.title} {normalized_name}")
-        for variant in variants:
-            target = _normalize_wizard_text(variant)
+        for target in context.color_targets:
             for option in options:
-                if target and target in option.normalized:
+                if target in option.normalized:
                     return option
         return options[0]
 
@@ -786,34 +1366,54 @@ def _pick_wizard_option(
 
 
 def _extract_contextual_price(text: str) -> tuple[float | None, str]:
-    if not text:
+    # Every contextual price ends with a euro sign; API bodies and bundles rarely carry one.
+    if not text or "€" not in text:
         return None, ""
 
-    candidates: list[tuple[int, float, str]] = []
-    for match in re.finditer(r"\d{1,3}(?:[.\s]\d{3})*(?:,\d{2})?\s*€", text):
-        snippet = text[max(0, match.start() - 80) : min(len(text), match.end() + 80)]
-        snippet_normalized = _normalize_wizard_text(snippet)
-        blocker_hits = sum(1 for blocker in PRICE_CONTEXT_BLOCKERS if blocker in snippet_normalized)
+    best: tuple[int, float] | None = None
+    best_snippet = ""
+    # The text is lowered and translated once; each window then only needs the whitespace collapse.
+    # The per-char table makes this equal to normalizing the window, unless lower() changed the
+    # length (e.g. "İ"), where offsets no longer line up and windows are normalized one by one.
+    translated: str | None = None
+    for match in CONTEXTUAL_PRICE_PATTERN.finditer(text):
         value = parse_eur_price(match.group(0))
         if value is None or value <= 0 or value > 5000:
             continue
+        start = max(0, match.start() - 80)
+        end = match.end() + 80
+        snippet = text[start:end]
+        if translated is None:
+            lowered = text.lower()
+            translated = _sanitize_lowered_text(lowered) if len(lowered) == len(text) else ""
+        if translated:
+            snippet_normalized = " ".join(translated[start:end].split())
+        else:
+            snippet_normalized = _normalize_wizard_text_uncached(snippet)
 
-        score = 0
+        score = 3 if value >= 120 else 0
         for hint in PRICE_CONTEXT_HINTS:
             if hint in snippet_normalized:
                 score += 8
-        score -= blocker_hits * 8
-        if value >= 120:
-            score += 3
-        candidates.append((score, value, snippet.strip()))
-
-    if not candidates:
+        # Blockers only lower the score: a window that cannot take the lead even without them
+        # skips the blocker scan.
+        if best is not None and (score, value) <= best:
+            continue
+        for blocker in PRICE_CONTEXT_BLOCKERS:
+            if blocker in snippet_normalized:
+                score -= 8
+        # Strict comparison keeps the first of equal candidates, like max() did.
+        if best is None or (score, value) > best:
+            best = (score, value)
+            best_snippet = snippet
+
+    if best is None or best[0] <= 0:
         return None, ""
+    return best[1], best_snippet.strip()
 
-    score, value, snippet = max(candidates, key=lambda item: (item[0], item[1]))
-    if score <= 0:
-        return None, ""
-    return value, snippet
+
+def _html_may_contain_euro(html: str) -> bool:
+    return "€" in html or EURO_ENTITY_PATTERN.search(html) is not None
 
 
 def _is_email_gate_text(text: str) -> bool:
@@ -828,21 +1428,31 @@ def _is_email_gate_text(text: str) -> bool:
 
 def _parse_plain_price(value: str | int | float) -> float | None:
     if isinstance(value, (int, float)):
-        parsed = float(value)
-    else:
-        raw = str(value or "").strip()
-        if not raw:
-            return None
-        raw = raw.replace(" ", "")
-        if "," in raw and "." in raw:
-            # assume European format 1.234,56
-            raw = raw.replace(".", "").replace(",", ".")
-        else:
-            raw = raw.replace(",", ".")
-        try:
-            parsed = float(raw)
-        except ValueError:
-            return None
+        return _bounded_plain_price(float(value))
+    raw = value if isinstance(value, str) else str(value or "")
+    if len(raw) <= PLAIN_PRICE_CACHE_MAX_LENGTH:
+        return _parse_plain_price_text(raw)
+    return _parse_plain_price_text.__wrapped__(raw)
+
+
+@lru_cache(maxsize=2048)
+def _parse_plain_price_text(raw: str) -> float | None:
+    raw = raw.strip().replace(" ", "")
+    if not raw:
+        return None
+    if "," in raw and "." in raw:
+        # assume European format 1.234,56
+        raw = raw.replace(".", "").replace(",", ".")
+    elif "," in raw:
+        raw = raw.replace(",", ".")
+    try:
+        parsed = float(raw)
+    except ValueError:
+        return None
+    return _bounded_plain_price(parsed)
+
+
+def _bounded_plain_price(parsed: float) -> float | None:
     if parsed > 5000 and parsed <= 500000:
         parsed = parsed / 100
     if 20 <= parsed <= 5000:
@@ -853,10 +1463,15 @@ def _parse_plain_price(value: str | int | float) -> float | None:
 def _extract_keyed_prices_from_text(text: str) -> list[tuple[int, float, str]]:
     if not text:
         return []
+    # Keywords hold no whitespace, so probing the raw lowered text finds the same keywords as the
+    # collapsed one; bodies without any skip the whitespace collapse as well.
+    lowered = text.lower()
+    present = [pattern for keyword, pattern in NETWORK_KEYED_PRICE_PATTERNS if keyword in lowered]
+    if not present:
+        return []
     normalized = " ".join(text.split())
     candidates: list[tuple[int, float, str]] = []
-    for keyword in NETWORK_PRICE_KEYS:
-        pattern = re.compile(rf"(?i){re.escape(keyword)}[^0-9€]{{0,40}}(\d{{2,5}}(?:[.,]\d{{1,2}})?)\s*€?")
+    for pattern in present:
         for match in pattern.finditer(normalized):
             value = _parse_plain_price(match.group(1))
             if value is None:
@@ -867,49 +1482,140 @@ def _extract_keyed_prices_from_text(text: str) -> list[tuple[int, float, str]]:
     return candidates
 
 
+def _is_capturable_response(response: Any) -> bool:
+    # Filter before scheduling a capture task so static assets never cross the Playwright IPC boundary.
+    # Most events are third-party (analytics, ads, CDNs): reject them on the host alone, which also
+    # drops beacons that merely carry a trendevice.com referrer in their query string.
+    url = str(getattr(response, "url", "") or "")
+    if "trendevice.com" not in _url_hostname(url):
+        return False
+    request = getattr(response, "request", None)
+    resource_type = str(getattr(request, "resource_type", "") or "").lower()
+    if resource_type in NETWORK_SKIPPED_RESOURCE_TYPES:
+        return False
+    headers = getattr(response, "headers", {}) or {}
+    content_type = str(headers.get("content-type", "")).lower()
+    if content_type.startswith(NETWORK_SKIPPED_CONTENT_TYPES):
+        return False
+    content_length = str(headers.get("content-length", "") or "").strip()
+    if content_length.isdigit() and int(content_length) > NETWORK_MAX_CAPTURE_BYTES:
+        return False
+    if NETWORK_INTERESTING_URL_PATTERN.search(url.lower()) is not None:
+        return True
+    return NETWORK_TEXTUAL_CONTENT_TYPE_PATTERN.search(content_type) is not None
+
+
+def _may_contain_price_keys(raw: str) -> bool:
+    # JSON leaves are only scored when their key path mentions a price keyword, so bodies without
+    # any keyword can skip decoding altogether. Substring probes on the lowered text are several
+    # times cheaper than one case-insensitive alternation scan.
+    lowered = raw.lower()
+    return any(keyword in lowered for keyword in NETWORK_PRICE_KEYS)
+
+
+def _json_key_has_price_keyword(key_text: str) -> bool:
+    # Keys repeat across every object of a list, so short ones are answered from a cache.
+    if len(key_text) <= WIZARD_TEXT_CACHE_MAX_LENGTH:
+        return _json_key_has_price_keyword_cached(key_text)
+    return _json_key_has_price_keyword_uncached(key_text)
+
+
+@lru_cache(maxsize=4096)
+def _json_key_has_price_keyword_cached(key_text: str) -> bool:
+    return _json_key_has_price_keyword_uncached(key_text)
+
+
+def _json_key_has_price_keyword_uncached(key_text: str) -> bool:
+    key_norm = _normalize_wizard_text(key_text)
+    return any(keyword in key_norm for keyword in NETWORK_PRICE_KEYS)
+
+
+def _json_path_text(node: tuple[Any, str, bool] | None) -> str:
+    segments: list[tuple[str, bool]] = []
+    while node is not None:
+        node, segment, is_index = node
+        segments.append((segment, is_index))
+    path = ""
+    for segment, is_index in reversed(segments):
+        if is_index:
+            path = f"{path}[{segment}]"
+        else:
+            path = f"{path}.{segment}" if path else segment
+    return path
+
+
 def _extract_prices_from_json_blob(blob: Any, path: str = "") -> list[tuple[int, float, str]]:
-    candidates: list[tuple[int, float, str]] = []
-    if isinstance(blob, dict):
-        for key, value in blob.items():
-            key_text = str(key)
-            next_path = f"{path}.{key_text}" if path else key_text
-            candidates.extend(_extract_prices_from_json_blob(value, next_path))
-        return candidates
-    if isinstance(blob, list):
-        for index, value in enumerate(blob):
-            next_path = f"{path}[{index}]"
-            candidates.extend(_extract_prices_from_json_blob(value, next_path))
-        return candidates
-
-    if not isinstance(blob, (str, int, float)):
-        return candidates
-    path_norm = _normalize_wizard_text(path)
-    if not any(keyword in path_norm for keyword in NETWORK_PRICE_KEYS):
-        return candidates
-
-    if isinstance(blob, str):
-        value = parse_eur_price(blob) or _parse_plain_price(blob)
-        if value is None:
-            return candidates
-    else:
-        value = _parse_plain_price(blob)
-        if value is None:
-            return candidates
+    return list(_iter_prices_from_json_blob(blob, path))
+
+
+def _iter_prices_from_json_blob(blob: Any, path: str = "") -> Iterator[tuple[int, float, str]]:
+    # Iterative pre-order walk yielding price-keyed leaves as they are found. Each entry links to its
+    # parent instead of carrying a path string, so dotted paths are only built for price-keyed leaves.
+    # Keywords never contain separators, so "some key segment matches" is equivalent to matching the
+    # whole normalized path.
+    root = (None, path, False) if path else None
+    stack: list[tuple[Any, tuple[Any, str, bool] | None, bool]] = [(blob, root, _json_key_has_price_keyword(path))]
+    while stack:
+        value, node, keyed = stack.pop()
+        # Scalars outside a price-keyed path can never yield, so they are not even pushed.
+        if isinstance(value, dict):
+            children = []
+            for key, child in value.items():
+                key_text = str(key)
+                child_keyed = keyed or _json_key_has_price_keyword(key_text)
+                if child_keyed or isinstance(child, (dict, list)):
+                    children.append((child, (node, key_text, False), child_keyed))
+            stack.extend(reversed(children))
+            continue
+        if isinstance(value, list):
+            if keyed:
+                stack.extend((value[index], (node, str(index), True), True) for index in range(len(value) - 1, -1, -1))
+            else:
+                stack.extend(
+                    (value[index], (node, str(index), True), False)
+                    for index in range(len(value) - 1, -1, -1)
+                    if isinstance(value[index], (dict, list))
+                )
+            continue
+        if not keyed or not isinstance(value, (str, int, float)):
+            continue
+        if isinstance(value, str):
+            parsed = parse_eur_price(value) or _parse_plain_price(value)
+        else:
+            parsed = _parse_plain_price(value)
+        if parsed is None:
+            continue
+        yield 72, parsed, f"{_json_path_text(node)}={value}"
 
-    candidates.append((72, value, f"{path}={blob}"))
-    return candidates
+
+def _has_script_quote_term(snippet: str) -> bool:
+    # The raw search can only miss what normalization would miss too, so most rejected rows
+    # never get normalized; matches are confirmed on the normalized text as before.
+    if SCRIPT_QUOTE_RAW_PATTERN.search(snippet) is None:
+        return False
+    return SCRIPT_QUOTE_TERM_PATTERN.search(_normalize_wizard_text(snippet)) is not None
+
+
+def _count_token_hits(tokens: tuple[str, ...] | list[str], joined: str, joined_words: frozenset[str]) -> int:
+    # Whole-word hits resolve with a set lookup; only the rest fall back to the substring scan,
+    # so the count matches a plain "token in joined" check.
+    return sum(1 for token in tokens if token and (token in joined_words or token in joined))
 
 
 def _pick_best_network_candidate(
-    candidates: list[dict[str, Any]],
+    candidates: Iterable[NetworkPriceCandidate | dict[str, Any]],
     *,
     normalized_name: str | None = None,
     wizard_steps: list[dict[str, Any]] | None = None,
 ) -> tuple[float | None, str]:
-    credible = [item for item in candidates if _is_credible_network_candidate(item)]
+    credible = [
+        candidate
+        for candidate in (NetworkPriceCandidate.coerce(item) for item in candidates)
+        if _is_credible_network_candidate(candidate)
+    ]
     if not credible:
         return None, ""
-    model_tokens = _query_tokens(normalized_name or "")[:7] if normalized_name else []
+    model_tokens = _query_tokens(normalized_name or "")[:7] if normalized_name else ()
     selected_tokens: list[str] = []
     for step in (wizard_steps or []):
         if not isinstance(step, dict):
@@ -924,103 +1630,93 @@ def _pick_best_network_candidate(
                 selected_tokens.append(token)
             if len(selected_tokens) >= 8:
                 break
-    ranked_rows: list[dict[str, Any]] = []
+    # Running best instead of collecting ranked rows; strict ">" keeps the first of equal keys like max().
+    best: NetworkPriceCandidate | None = None
+    best_key: tuple[int, int, int, int, float] | None = None
+    # Candidates from the same response share a URL; split it once.
+    url_texts: dict[str, str] = {}
     for item in credible:
-        snippet = str(item.get("snippet", ""))
-        url = str(item.get("url", ""))
-        joined = _normalize_wizard_text(f"{snippet} {urlparse(url).path} {urlparse(url).query}")
-        token_hits = sum(1 for token in model_tokens if token and token in joined)
-        selected_hits = sum(1 for token in selected_tokens if token and token in joined)
-        source = str(item.get("source", "")).strip().lower()
+        url_text = url_texts.get(item.url)
+        if url_text is None:
+            parsed_url = urlparse(item.url)
+            url_text = url_texts[item.url] = f"{parsed_url.path} {parsed_url.query}"
+        joined = _normalize_wizard_text(f"{item.snippet} {url_text}")
+        joined_words = frozenset(joined.split())
+        token_hits = _count_token_hits(model_tokens, joined, joined_words)
         if model_tokens and token_hits <= 0:
             continue
-        if source == "json" and model_tokens and token_hits < 2:
+        if model_tokens and token_hits < 2 and item.source.strip().lower() == NETWORK_SOURCE_JSON:
             continue
-        row = dict(item)
-        row["token_hits"] = token_hits
-        row["selected_hits"] = selected_hits
-        ranked_rows.append(row)
+        selected_hits = _count_token_hits(selected_tokens, joined, joined_words)
+        key = (item.wizard_progress, token_hits, selected_hits, item.score, item.value)
+        if best_key is None or key > best_key:
+            best = item
+            best_key = key
 
-    if not ranked_rows:
+    if best is None:
         return None, ""
-    best = max(
-        ranked_rows,
-        key=lambda item: (
-            int(item.get("wizard_progress", 0) or 0),
-            int(item.get("token_hits", 0) or 0),
-            int(item.get("selected_hits", 0) or 0),
-            int(item.get("score", 0)),
-            float(item.get("value", 0.0)),
-        ),
-    )
-    value = _parse_plain_price(best.get("value"))
+    value = _parse_plain_price(best.value)
     if value is None:
         return None, ""
-    snippet = str(best.get("snippet", "")).strip() or str(best.get("url", "")).strip()
+    snippet = best.snippet.strip() or best.url.strip()
     return value, snippet[:260]
 
 
-def _is_credible_network_candidate(candidate: dict[str, Any]) -> bool:
-    url = str(candidate.get("url", "")).lower()
-    if "/_next/static/" in url or url.endswith(".js") or url.endswith(".css"):
+def _is_credible_network_candidate(candidate: NetworkPriceCandidate | dict[str, Any]) -> bool:
+    candidate = NetworkPriceCandidate.coerce(candidate)
+    url = candidate.url.lower()
+    if url.endswith((".js", ".css")) or "/_next/static/" in url:
         return False
 
-    score = int(candidate.get("score", 0))
-    source = str(candidate.get("source", ""))
-    snippet_norm = _normalize_wizard_text(str(candidate.get("snippet", "")))
-    if any(blocker in snippet_norm for blocker in NETWORK_PROMO_BLOCKERS):
+    score = candidate.score
+    source = candidate.source
+    snippet_norm = _normalize_wizard_text(candidate.snippet)
+    if NETWORK_PROMO_BLOCKER_PATTERN.search(snippet_norm):
         return False
 
-    if source == "json":
-        # JSON payloads can include entire catalog price lists. Require stronger quote context
-        # than just "price" to avoid overestimations.
-        strong_terms = (
-            "valuation",
-            "valutazione",
-            "quote",
-            "quotazione",
-            "offerta",
-            "offer",
-            "cash",
-            "payout",
-            "amount",
-            "totale",
-            "ti offriamo",
-            "ricevi",
-            "paghiamo",
-        )
-        if not any(term in snippet_norm for term in strong_terms):
+    if source == NETWORK_SOURCE_JSON:
+        if not NETWORK_JSON_STRONG_TERM_PATTERN.search(snippet_norm):
             return False
         return score >= 68
     if score < 62:
         return False
-    valuation_terms = ("ti offriamo", "valutazione", "ricevi", "paghiamo", "quotazione", "offerta")
-    return any(term in snippet_norm for term in valuation_terms)
+    return NETWORK_VALUATION_TERM_PATTERN.search(snippet_norm) is not None
 
 
-def _is_generic_trenddevice_url(url: str | None) -> bool:
-    parsed = urlparse(url or "")
+def _url_hostname(url: str | None) -> str:
+    # Cheap equivalent of urlparse(url).hostname for the post-navigation host guard.
+    _scheme, separator, rest = (url or "").partition("://")
+    if not separator:
+        return ""
+    # Only the authority is lowercased; navigation URLs can carry long query strings.
+    netloc = rest.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0].rpartition("@")[2].lower()
+    if netloc.startswith("["):
+        return netloc[1:].split("]", 1)[0]
+    return netloc.split(":", 1)[0]
+
+
+def _is_generic_trenddevice_url(url: str | None, *, parsed: ParseResult | None = None) -> bool:
+    if parsed is None:
+        parsed = urlparse(url or "")
     path = (parsed.path or "").strip("/").lower()
     if not path:
         return True
     return path in {"vendi", "vendi/valutazione"}
 
 
-def _assess_trenddevice_match(
-    *,
-    product: AmazonProduct,
-    normalized_name: str,
-    wizard_steps: list[dict[str, Any]],
-    source_url: str | None,
-    price_text: str | None,
-) -> dict[str, Any]:
-    def _extract_watch_generation_signature(text: str) -> dict[str, str]:
-        normalized = _normalize_wizard_text(text)
-        signature: dict[str, str] = {}
+def _extract_watch_generation_signature(text: str) -> dict[str, str]:
+    normalized = _normalize_wizard_text(text)
+    signature: dict[str, str] = {}
+    has_series = "serie" in normalized
+    has_ultra = "ultra" in normalized
+    if not has_series and not has_ultra:
+        return signature
 
+    if has_series:
+        # finditer yields in position order, so the first valid hit per pattern is its earliest.
         series_hits: list[tuple[int, str]] = []
-        for pattern in (r"\b(?:serie|series)\s*(\d{1,2})\b", r"\b(\d{1,2})\s*(?:serie|series)\b"):
-            for match in re.finditer(pattern, normalized):
+        for pattern in WATCH_SERIES_PATTERNS:
+            for match in pattern.finditer(normalized):
                 raw_value = match.group(1)
                 try:
                     parsed_value = int(raw_value)
@@ -1028,12 +1724,13 @@ def _assess_trenddevice_match(
                     continue
                 if 1 <= parsed_value <= 20:
                     series_hits.append((match.start(), str(parsed_value)))
+                    break
         if series_hits:
-            series_hits.sort(key=lambda item: item[0])
-            signature["series"] = series_hits[0][1]
+            signature["series"] = min(series_hits, key=lambda item: item[0])[1]
 
+    if has_ultra:
         ultra_generation: str | None = None
-        for match in re.finditer(r"\bultra\s*(\d{1,2})\b", normalized):
+        for match in WATCH_ULTRA_PATTERN.finditer(normalized):
             raw_value = match.group(1)
             try:
                 parsed_value = int(raw_value)
@@ -1045,61 +1742,122 @@ def _assess_trenddevice_match(
             if 1 <= parsed_value <= 5:
                 ultra_generation = str(parsed_value)
                 break
-        if ultra_generation is not None:
-            signature["ultra"] = ultra_generation
-        elif "ultra" in normalized:
-            signature["ultra"] = "base"
-        return signature
+        signature["ultra"] = ultra_generation if ultra_generation is not None else "base"
+    return signature
 
-    query_norm = _normalize_wizard_text(normalized_name)
-    selected_parts = [
-        _normalize_wizard_text(str(step.get("selected", "")))
+
+ANCHOR_WORD_POOL: frozenset[str] = frozenset(
+    sys.intern(token) for anchor in ANCHOR_TOKENS for token in _normalize_wizard_text(anchor).split() if token
+)
+
+
+@lru_cache(maxsize=256)
+def _match_similarity_ratio(query_norm: str, candidate_norm: str) -> float:
+    # Ratcliff-Obershelp on purpose: the match floors below (0.56/0.60) are calibrated on it.
+    # Memoized because retries and rescans assess the same product/candidate pair again.
+    return SequenceMatcher(None, query_norm, candidate_norm).ratio()
+
+
+def _assess_trenddevice_match(
+    *,
+    product: AmazonProduct,
+    normalized_name: str,
+    wizard_steps: list[dict[str, Any]],
+    source_url: str | None,
+    price_text: str | None,
+) -> dict[str, Any]:
+    # Only the (step_type, selected) pairs of the wizard feed the assessment, so re-valuations of
+    # the same product and path reuse it; callers get their own copy to store in the payload.
+    steps = tuple(
+        (str(step.get("step_type")), str(step.get("selected", "")))
         for step in wizard_steps
         if isinstance(step, dict)
-    ]
+    )
+    match = _assess_trenddevice_match_cached(normalized_name, steps, source_url, price_text)
+    return {**match, "hit_tokens": list(match["hit_tokens"]), "required_tokens": list(match["required_tokens"])}
+
+
+@lru_cache(maxsize=1024)
+def _assess_trenddevice_match_cached(
+    normalized_name: str,
+    steps: tuple[tuple[str, str], ...],
+    source_url: str | None,
+    price_text: str | None,
+) -> dict[str, Any]:
+    query_norm = _normalize_wizard_text(normalized_name)
+    selected_parts = [_normalize_wizard_text(selected) for _step_type, selected in steps]
     selected_combined = " ".join(part for part in selected_parts if part)
-    url_parts = " ".join(part for part in ((urlparse(source_url or "").path or ""), (urlparse(source_url or "").query or "")) if part)
+    parsed_source_url = urlparse(source_url or "")
+    url_parts = " ".join(part for part in (parsed_source_url.path or "", parsed_source_url.query or "") if part)
     candidate_norm = _normalize_wizard_text(" ".join((selected_combined, str(price_text or ""), url_parts)))
 
-    ratio = SequenceMatcher(None, query_norm, candidate_norm).ratio() if query_norm and candidate_norm else 0.0
+    generic_url = _is_generic_trenddevice_url(source_url, parsed=parsed_source_url)
+    has_model_step = any(step_type == STEP_MODEL for step_type, _selected in steps)
+
+    # Family/generation mismatches only need the normalized texts; the candidate signature is only
+    # built for watch queries that carry one. They still report the full figures below.
+    mismatch_reason: str | None = None
+    watch_intent = any(token in query_norm for token in WATCH_INTENT_TERMS)
+    if watch_intent:
+        query_generation = _extract_watch_generation_signature(query_norm)
+        if query_generation:
+            candidate_generation = _extract_watch_generation_signature(candidate_norm)
+            if query_generation.get("series") and candidate_generation.get("series"):
+                if query_generation["series"] != candidate_generation["series"]:
+                    mismatch_reason = "model-generation-mismatch"
+            if mismatch_reason is None and query_generation.get("ultra") and candidate_generation.get("ultra"):
+                if query_generation["ultra"] != candidate_generation["ultra"]:
+                    mismatch_reason = "model-generation-mismatch"
+            if (
+                mismatch_reason is None
+                and query_generation.get("ultra") == "base"
+                and candidate_generation.get("ultra") not in {None, "base"}
+            ):
+                mismatch_reason = "model-generation-mismatch"
+        if (
+            mismatch_reason is None
+            and "iphone" in selected_combined
+            and "watch" not in selected_combined
+            and "garmin" not in selected_combined
+        ):
+            mismatch_reason = "device-family-mismatch"
+
     tokens = _query_tokens(normalized_name)
     capacities = _capacity_tokens(normalized_name)
-    anchor_word_pool = {
-        token
-        for anchor in ANCHOR_TOKENS
-        for token in _normalize_wizard_text(anchor).split()
-        if token
-    }
-    anchor_words = sorted({token for token in tokens if token in anchor_word_pool})
+    anchor_words = sorted({token for token in tokens if token in ANCHOR_WORD_POOL})
     if "apple watch" in query_norm and "watch" not in anchor_words:
         anchor_words.append("watch")
 
-    required_tokens: list[str] = []
-    for item in capacities:
-        if item not in required_tokens:
-            required_tokens.append(item)
-    for item in anchor_words:
-        if item not in required_tokens:
-            required_tokens.append(item)
-    for item in tokens:
-        if item.isdigit() or re.search(r"\d", item):
-            if item not in required_tokens:
-                required_tokens.append(item)
+    # Dict as an ordered set: capacities, anchors and digit tokens always count; plain tokens top it up to 7.
+    required: dict[str, None] = dict.fromkeys(capacities)
+    required.update(dict.fromkeys(anchor_words))
+    required.update(dict.fromkeys(_query_digit_tokens(normalized_name)))
     for item in tokens:
         if item in OPTIONAL_DESCRIPTOR_TOKENS:
             continue
-        if item not in required_tokens:
-            required_tokens.append(item)
-        if len(required_tokens) >= 7:
+        required.setdefault(item)
+        if len(required) >= 7:
             break
+    required_tokens = list(required)
 
     candidate_compact = candidate_norm.replace(" ", "")
+    candidate_words = frozenset(candidate_norm.split())
+
+    # Capacity and anchor tokens are usually also required tokens: answer each token once.
+    token_presence: dict[str, bool] = {}
 
     def _token_present(token: str) -> bool:
+        present = token_presence.get(token)
+        if present is None:
+            present = token_presence[token] = _token_present_uncached(token)
+        return present
+
+    def _token_present_uncached(token: str) -> bool:
         normalized_token = _normalize_wizard_text(token)
         if not normalized_token:
             return False
-        if normalized_token in candidate_norm:
+        # Whole-word tokens (most of them) resolve with a set lookup before any substring scan.
+        if normalized_token in candidate_words or normalized_token in candidate_norm:
             return True
         compact_token = normalized_token.replace(" ", "")
         if compact_token and compact_token in candidate_compact:
@@ -1114,56 +1872,13 @@ def _assess_trenddevice_match(
     capacity_hits = [token for token in capacities if _token_present(token)]
     anchor_hits = [token for token in anchor_words if _token_present(token)]
     token_ratio = (len(hit_tokens) / len(required_tokens)) if required_tokens else 0.0
-    generic_url = _is_generic_trenddevice_url(source_url)
-    has_model_step = any(str(step.get("step_type")) == STEP_MODEL for step in wizard_steps if isinstance(step, dict))
+    ratio = _match_similarity_ratio(query_norm, candidate_norm) if query_norm and candidate_norm else 0.0
     score = int((ratio * 100) + (len(hit_tokens) * 13) + (len(anchor_hits) * 10) + (14 if has_model_step else -14) - (34 if generic_url else 0))
 
-    watch_intent = any(token in query_norm for token in ("watch", "garmin", "fenix", "epix", "forerunner"))
-    query_generation = _extract_watch_generation_signature(query_norm)
-    candidate_generation = _extract_watch_generation_signature(candidate_norm)
-    if watch_intent and query_generation:
-        if query_generation.get("series") and candidate_generation.get("series"):
-            if query_generation["series"] != candidate_generation["series"]:
-                return {
-                    "ok": False,
-                    "reason": "model-generation-mismatch",
-                    "score": score,
-                    "ratio": round(ratio, 3),
-                    "token_ratio": round(token_ratio, 3),
-                    "generic_url": generic_url,
-                    "has_model_step": has_model_step,
-                    "hit_tokens": hit_tokens,
-                    "required_tokens": required_tokens,
-                }
-        if query_generation.get("ultra") and candidate_generation.get("ultra"):
-            if query_generation["ultra"] != candidate_generation["ultra"]:
-                return {
-                    "ok": False,
-                    "reason": "model-generation-mismatch",
-                    "score": score,
-                    "ratio": round(ratio, 3),
-                    "token_ratio": round(token_ratio, 3),
-                    "generic_url": generic_url,
-                    "has_model_step": has_model_step,
-                    "hit_tokens": hit_tokens,
-                    "required_tokens": required_tokens,
-                }
-        if query_generation.get("ultra") == "base" and candidate_generation.get("ultra") not in {None, "base"}:
-            return {
-                "ok": False,
-                "reason": "model-generation-mismatch",
-                "score": score,
-                "ratio": round(ratio, 3),
-                "token_ratio": round(token_ratio, 3),
-                "generic_url": generic_url,
-                "has_model_step": has_model_step,
-                "hit_tokens": hit_tokens,
-                "required_tokens": required_tokens,
-            }
-    if watch_intent and "iphone" in selected_combined and "watch" not in selected_combined and "garmin" not in selected_combined:
+    if mismatch_reason is not None:
         return {
             "ok": False,
-            "reason": "device-family-mismatch",
+            "reason": mismatch_reason,
             "score": score,
             "ratio": round(ratio, 3),
             "token_ratio": round(token_ratio, 3),
@@ -1172,7 +1887,6 @@ def _assess_trenddevice_match(
             "hit_tokens": hit_tokens,
             "required_tokens": required_tokens,
         }
-
     if generic_url and not has_model_step:
         return {
             "ok": False,
@@ -1263,11 +1977,170 @@ def _assess_trenddevice_match(
     }
 
 
+@dataclass(slots=True)
+class ResponseCaptureState:
+    # Only the latest captures matter; the deque evicts the oldest ones on append.
+    candidates: deque[NetworkPriceCandidate] = field(default_factory=lambda: deque(maxlen=NETWORK_CANDIDATES_LIMIT))
+    # XHR bursts during wizard transitions can queue dozens of captures at once; a few long-lived
+    # workers drain them instead of one task (and done callback) per response.
+    queue: asyncio.Queue[Any] = field(default_factory=lambda: asyncio.Queue(maxsize=RESPONSE_CAPTURE_QUEUE_SIZE))
+    workers: list[asyncio.Task[None]] = field(default_factory=list)
+    wizard_progress: int = 0
+    # Credible candidates ever added; unlike len(candidates) it keeps growing once the deque is full.
+    captured: int = 0
+    # Set once the workers are stopped: late responses during context teardown must not respawn them.
+    closed: bool = False
+    # (url, content type, body length, body hash) -> top scanned rows, least recently used first.
+    body_rows: OrderedDict[tuple[str, str, int, int], list[tuple[int, float, str, str]]] = field(
+        default_factory=OrderedDict
+    )
+
+
+def _scan_response_body(raw: bytes, content_type: str) -> list[tuple[int, float, str, str]]:
+    # Only the scanned prefix is decoded; a multi-byte character cut by the cap becomes U+FFFD.
+    trimmed = raw[:NETWORK_SCAN_MAX_BYTES].decode("utf-8", "replace")
+    # A catalog larger than the cap is cut mid-document, so decoding it would build
+    # most of the tree only to fail at the end.
+    body_truncated = len(raw) > NETWORK_SCAN_MAX_BYTES
+    # Candidates are kept as parallel columns; rows are only materialized for the top 3.
+    scores: list[int] = []
+    values: list[float] = []
+    snippets: list[str] = []
+    sources: list[str] = []
+    add_score = scores.append
+    add_value = values.append
+    add_snippet = snippets.append
+    add_source = sources.append
+
+    contextual_value, contextual_snippet = _extract_contextual_price(trimmed)
+    if contextual_value is not None:
+        add_score(68)
+        add_value(float(contextual_value))
+        add_snippet(contextual_snippet[:260])
+        add_source(NETWORK_SOURCE_CONTEXT)
+    for score, value, snippet in _extract_keyed_prices_from_text(trimmed):
+        add_score(int(score))
+        add_value(float(value))
+        add_snippet(snippet[:260])
+        add_source(NETWORK_SOURCE_KEYWORD)
+
+    parsed_json = None
+    if not body_truncated and (
+        "json" in content_type or JSON_DOCUMENT_START_PATTERN.match(raw) is not None
+    ) and _may_contain_price_keys(trimmed):
+        try:
+            parsed_json = _json_loads(raw)
+        except Exception:
+            parsed_json = None
+    if parsed_json is not None:
+        for score, value, snippet in _iter_prices_from_json_blob(parsed_json):
+            add_score(int(score))
+            add_value(float(value))
+            add_snippet(snippet[:260])
+            add_source(NETWORK_SOURCE_JSON)
+
+    top_indexes = heapq.nlargest(3, range(len(scores)), key=lambda index: (scores[index], values[index]))
+    return [(scores[index], values[index], snippets[index], sources[index]) for index in top_indexes]
+
+
+async def _capture_response_body(response: Any, capture: ResponseCaptureState) -> None:
+    url = str(getattr(response, "url", "") or "")
+    headers = getattr(response, "headers", {}) or {}
+    content_type = str(headers.get("content-type", "")).lower()
+    try:
+        raw = await response.body()
+    except Exception:
+        return
+    if not raw:
+        return
+    # Stagnant steps and retries replay the same endpoints: identical bodies reuse their scan.
+    cache_key = (url, content_type, len(raw), hash(raw))
+    body_cache = capture.body_rows
+    top_rows = body_cache.get(cache_key)
+    if top_rows is None:
+        top_rows = _scan_response_body(raw, content_type)
+        body_cache[cache_key] = top_rows
+        if len(body_cache) > RESPONSE_BODY_CACHE_SIZE:
+            body_cache.popitem(last=False)
+    else:
+        body_cache.move_to_end(cache_key)
+
+    if not top_rows:
+        return
+
+    add_network_candidate = capture.candidates.append
+    status = getattr(response, "status", None)
+    content_type_label = content_type[:60]
+    for score, value, snippet, source in top_rows:
+        row = NetworkPriceCandidate(
+            score=score,
+            value=value,
+            snippet=snippet,
+            source=source,
+            url=url,
+            status=status,
+            content_type=content_type_label,
+            wizard_progress=capture.wizard_progress,
+        )
+        if not _is_credible_network_candidate(row):
+            continue
+        add_network_candidate(row)
+        capture.captured += 1
+
+
+def _on_response(response: Any, capture: ResponseCaptureState) -> None:
+    if capture.closed or not _is_capturable_response(response):
+        return
+    try:
+        capture.queue.put_nowait(response)
+    except asyncio.QueueFull:
+        return
+    if not capture.workers:
+        capture.workers = [
+            asyncio.create_task(_response_capture_worker(capture)) for _ in range(RESPONSE_CAPTURE_WORKERS)
+        ]
+
+
+async def _response_capture_worker(capture: ResponseCaptureState) -> None:
+    queue = capture.queue
+    while True:
+        response = await queue.get()
+        try:
+            await _capture_response_body(response, capture)
+        except Exception:
+            pass
+        finally:
+            queue.task_done()
+
+
+async def _drain_response_tasks(capture: ResponseCaptureState) -> None:
+    if capture.workers:
+        await capture.queue.join()
+
+
+async def _stop_response_workers(capture: ResponseCaptureState) -> None:
+    capture.closed = True
+    workers, capture.workers = capture.workers, []
+    for worker in workers:
+        worker.cancel()
+    if workers:
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
 class TrendDeviceValuator(BaseValuator):
     platform_name = "trenddevice"
     condition_label = "grado_a"
     base_url = "https://www.trendevice.com/vendi/valutazione/"
 
+    @classmethod
+    async def aclose(cls) -> None:
+        # Each resource is released on its own so one failing close cannot keep the other open.
+        for close in (close_trenddevice_api_client, close_shared_chromium):
+            try:
+                await close()
+            except Exception as exc:
+                print(f"[trenddevice] shutdown cleanup failed | step={close.__name__} error={exc}")
+
     async def _collect_wizard_options(self, page: Page) -> list[WizardOption]:
         options: list[WizardOption] = []
         seen: set[str] = set()
@@ -1281,22 +2154,21 @@ class TrendDeviceValuator(BaseValuator):
                 "button[class*='option' i]",
             ],
         )
-        for selector in option_selectors:
-            nodes = page.locator(selector)
-            try:
-                count = min(await nodes.count(), 90)
-            except PlaywrightError:
+        # One evaluate_all per selector instead of count + is_visible + inner_text per node, and all
+        # selectors in flight together; results are consumed in selector order as before.
+        results = await asyncio.gather(
+            *(page.locator(selector).evaluate_all(WIZARD_OPTION_ROWS_SCRIPT, 90) for selector in option_selectors),
+            return_exceptions=True,
+        )
+        for selector, rows in zip(option_selectors, results):
+            if isinstance(rows, PlaywrightError):
                 continue
-            for index in range(count):
-                node = nodes.nth(index)
-                try:
-                    if not await node.is_visible():
-                        continue
-                    text = await node.inner_text(timeout=900)
-                except PlaywrightError:
+            if isinstance(rows, BaseException):
+                raise rows
+            for index, text in enumerate(rows or []):
+                if text is None:
                     continue
-
-                cleaned = re.sub(r"\s+", " ", text).strip()
+                cleaned = " ".join(str(text).split())
                 normalized = _normalize_wizard_text(cleaned)
                 if not cleaned or len(normalized) < 2:
                     continue
@@ -1324,6 +2196,23 @@ class TrendDeviceValuator(BaseValuator):
             elapsed += interval_ms
         return []
 
+    async def _wait_for_wizard_transition(
+        self,
+        page: Page,
+        previous_signature: tuple[str, ...],
+        *,
+        timeout_ms: int = 1200,
+        min_wait_ms: int = 200,
+    ) -> None:
+        # Advance as soon as the option list changes instead of sleeping a fixed delay per step.
+        await page.wait_for_timeout(min_wait_ms)
+        deadline = time.monotonic() + (max(0, timeout_ms - min_wait_ms) / 1000)
+        while time.monotonic() < deadline:
+            options = await self._collect_wizard_options(page)
+            if options and _options_signature(options) != previous_signature:
+                return
+            await page.wait_for_timeout(150)
+
     async def _select_option(self, page: Page, option: WizardOption) -> None:
         target = page.locator(option.selector).nth(option.index)
         radio = target.locator("input[type='radio'], input[name='item']").first
@@ -1347,11 +2236,9 @@ class TrendDeviceValuator(BaseValuator):
                 "button:has-text('Calcola')",
             ],
         )
-        for selector in selectors:
+        for selector in await self._present_selectors(page, selectors):
             button = page.locator(selector).first
             try:
-                if not await button.count():
-                    continue
                 await button.wait_for(state="visible", timeout=2200)
                 if not await button.is_enabled():
                     await page.wait_for_timeout(300)
@@ -1414,13 +2301,19 @@ class TrendDeviceValuator(BaseValuator):
                 return value, snippet
 
         html = await page.content()
-        soup = BeautifulSoup(html, "html.parser")
-        for node in soup.select("main, [class*='price' i], [class*='offerta' i], [class*='valut' i]"):
-            text = node.get_text(" ", strip=True)
-            value, snippet = _extract_contextual_price(text)
-            if value is not None:
-                return value, snippet
-        script_rows: list[tuple[int, float, str]] = []
+        soup = BeautifulSoup(html, HTML_PARSER_FEATURES)
+        # Contextual prices need a euro sign; without one anywhere in the markup the CSS selection
+        # and per-node text extraction cannot find anything.
+        if _html_may_contain_euro(html):
+            for node in soup.select("main, [class*='price' i], [class*='offerta' i], [class*='valut' i]"):
+                text = node.get_text(" ", strip=True)
+                value, snippet = _extract_contextual_price(text)
+                if value is not None:
+                    return value, snippet
+        # Running best over all script rows; a row only needs its quote-term check when it would
+        # take the lead (strict ">" keeps the first of equal rows, like max() did).
+        best_key: tuple[int, float] | None = None
+        best_snippet = ""
         for script in soup.select("script"):
             script_text = ""
             if script.string:
@@ -1430,27 +2323,28 @@ class TrendDeviceValuator(BaseValuator):
             if not script_text or len(script_text) < 30:
                 continue
             trimmed = script_text[:120000]
+            # Every row must carry a quote term, so scripts that never mention one (bundles,
+            # analytics, catalog state) skip both the keyed scan and the JSON decode.
+            if not SCRIPT_QUOTE_RAW_PATTERN.search(trimmed):
+                continue
             for score, value, snippet in _extract_keyed_prices_from_text(trimmed):
-                snippet_norm = _normalize_wizard_text(snippet)
-                if not any(term in snippet_norm for term in ("valutazione", "quote", "offerta", "ti offriamo", "ricevi")):
-                    continue
-                script_rows.append((score, value, snippet))
+                if (best_key is None or (score, value) > best_key) and _has_script_quote_term(snippet):
+                    best_key = (score, value)
+                    best_snippet = snippet
             script_type = (script.get("type") or "").lower()
             raw = trimmed.strip()
-            if "json" in script_type or raw.startswith("{") or raw.startswith("["):
+            if ("json" in script_type or raw.startswith("{") or raw.startswith("[")) and _may_contain_price_keys(raw):
                 try:
-                    parsed = json.loads(raw)
+                    parsed = _json_loads(raw)
                 except Exception:
                     parsed = None
                 if parsed is not None:
-                    for score, value, snippet in _extract_prices_from_json_blob(parsed):
-                        snippet_norm = _normalize_wizard_text(snippet)
-                        if not any(term in snippet_norm for term in ("valutazione", "quote", "offerta", "ti offriamo", "ricevi")):
-                            continue
-                        script_rows.append((score, value, snippet))
-        if script_rows:
-            _score, value, snippet = max(script_rows, key=lambda row: (row[0], row[1]))
-            return value, snippet[:260]
+                    for score, value, snippet in _iter_prices_from_json_blob(parsed):
+                        if (best_key is None or (score, value) > best_key) and _has_script_quote_term(snippet):
+                            best_key = (score, value)
+                            best_snippet = snippet
+        if best_key is not None:
+            return best_key[1], best_snippet[:260]
         body_text = soup.get_text(" ", strip=True)
         return None, body_text[:220]
 
@@ -1466,18 +2360,10 @@ class TrendDeviceValuator(BaseValuator):
             "button:has-text('Scopri valutazione')",
             "button:has-text('Scopri')",
         ]
-        for email_selector in email_input_selectors:
-            try:
-                if not await page.locator(email_selector).first.count():
-                    continue
-            except PlaywrightError:
-                continue
-            for cta_selector in cta_selectors:
-                try:
-                    if await page.locator(cta_selector).first.count():
-                        return True
-                except PlaywrightError:
-                    continue
+        # All seven probes in one concurrent round instead of up to 4 x 3 sequential counts.
+        present = set(await self._present_selectors(page, email_input_selectors + cta_selectors))
+        if not present.isdisjoint(email_input_selectors) and not present.isdisjoint(cta_selectors):
+            return True
         try:
             body_text = await page.inner_text("body", timeout=900)
         except PlaywrightError:
@@ -1590,9 +2476,23 @@ class TrendDeviceValuator(BaseValuator):
                 await page.wait_for_load_state("domcontentloaded", timeout=6500)
             except PlaywrightError:
                 pass
-            await page.wait_for_timeout(1400)
         return submitted
 
+    async def _wait_for_quote(self, page: Page, capture: ResponseCaptureState, timeout_ms: int) -> None:
+        # After the email gate the SPA fetches the quote by XHR without navigating, so load states
+        # are already reached. Poll the response capture for a new credible price instead; a quote
+        # that only renders in the DOM still gets the whole budget, as the former fixed sleep did.
+        baseline = capture.captured
+        waited = 0
+        while waited < timeout_ms:
+            step = min(QUOTE_WAIT_POLL_MS, timeout_ms - waited)
+            await page.wait_for_timeout(step)
+            waited += step
+            if capture.captured > baseline:
+                # Give the page a moment to render the quote the XHR just delivered.
+                await page.wait_for_timeout(min(QUOTE_RENDER_GRACE_MS, timeout_ms - waited))
+                return
+
     async def _try_api_offer(
         self,
         *,
@@ -1604,30 +2504,59 @@ class TrendDeviceValuator(BaseValuator):
             payload["api"] = {"enabled": False, "reason": "disabled-by-env"}
             return None, None
 
+        # Env-backed settings are read once per valuation, not on every request.
         timeout_seconds = _trenddevice_api_timeout_seconds()
+        base_url = _trenddevice_api_base_url()
 
-        def _run() -> dict[str, Any]:
+        async def _run() -> dict[str, Any]:
+            # The calls below are dependent (catalog -> model -> lead), and every POST registers a lead,
+            # so they stay sequential; a shared deadline keeps the worst case from stacking per-request timeouts.
+            deadline = time.monotonic() + max(timeout_seconds, _TRENDDEVICE_API_TOTAL_BUDGET_SECONDS)
             trace: dict[str, Any] = {
                 "enabled": True,
-                "base_url": _trenddevice_api_base_url(),
+                "base_url": base_url,
                 "timeout_seconds": timeout_seconds,
                 "post_attempts": [],
             }
 
-            catalog_data, catalog_meta = _trenddevice_api_request_json(
-                method="GET",
-                path="/vendi/usato",
-                timeout_seconds=timeout_seconds,
-            )
-            trace["catalog"] = catalog_meta
-            if not isinstance(catalog_data, dict):
-                return {"ok": False, "reason": "catalog-unavailable", "trace": trace}
-            devices = catalog_data.get("usatoDevice")
-            if not isinstance(devices, list) or not devices:
-                return {"ok": False, "reason": "catalog-empty", "trace": trace}
-
-            device = _trenddevice_api_pick_device(
-                devices=[item for item in devices if isinstance(item, dict)],
+            async def _request(
+                method: str, path: str, payload: dict[str, Any] | None = None
+            ) -> tuple[Any | None, dict[str, Any]]:
+                budget = _trenddevice_api_request_budget(deadline, timeout_seconds)
+                if budget is None:
+                    return None, {"ok": False, "status": None, "url": path, "error": "api-budget-exhausted"}
+                return await _trenddevice_api_request_json(
+                    method=method,
+                    path=path,
+                    payload=payload,
+                    timeout_seconds=budget,
+                    base_url=base_url,
+                )
+
+            # The catalog is the same for every product of a scan, so keep it (already indexed) for a while.
+            cached_catalog = _TRENDDEVICE_API_CATALOG_CACHE.get(base_url)
+            if cached_catalog is not None and cached_catalog[0] > time.monotonic():
+                _, device_index, devices_count = cached_catalog
+                trace["catalog"] = {"ok": True, "cached": True}
+            else:
+                catalog_data, catalog_meta = await _request("GET", "/vendi/usato")
+                trace["catalog"] = catalog_meta
+                if not isinstance(catalog_data, dict):
+                    return {"ok": False, "reason": "catalog-unavailable", "trace": trace}
+                devices = catalog_data.get("usatoDevice")
+                if not isinstance(devices, list) or not devices:
+                    return {"ok": False, "reason": "catalog-empty", "trace": trace}
+                device_index = _trenddevice_api_device_index(devices)
+                devices_count = sum(1 for item in devices if isinstance(item, dict))
+                if device_index:
+                    _TRENDDEVICE_API_CATALOG_CACHE[base_url] = (
+                        time.monotonic() + _TRENDDEVICE_API_CATALOG_TTL_SECONDS,
+                        device_index,
+                        devices_count,
+                    )
+
+            device = _trenddevice_api_pick_indexed_device(
+                device_index=device_index,
                 product=product,
                 normalized_name=normalized_name,
             )
@@ -1637,10 +2566,8 @@ class TrendDeviceValuator(BaseValuator):
             models = device.get("models")
             if not isinstance(models, list) or not models:
                 return {"ok": False, "reason": "model-list-empty", "trace": trace}
-            model = _trenddevice_api_pick_model(
-                models=[item for item in models if isinstance(item, dict)],
-                normalized_name=normalized_name,
-            )
+            model_rows = [item for item in models if isinstance(item, dict)]
+            model = _trenddevice_api_pick_model(models=model_rows, normalized_name=normalized_name)
             if not isinstance(model, dict):
                 return {"ok": False, "reason": "model-not-found", "trace": trace}
 
@@ -1654,11 +2581,7 @@ class TrendDeviceValuator(BaseValuator):
                 "model_name": str(model.get("nome") or ""),
             }
 
-            detail_data, detail_meta = _trenddevice_api_request_json(
-                method="GET",
-                path=f"/vendi/usato/{model_id}",
-                timeout_seconds=timeout_seconds,
-            )
+            detail_data, detail_meta = await _request("GET", f"/vendi/usato/{model_id}")
             trace["model_detail"] = detail_meta
             if not isinstance(detail_data, dict):
                 return {"ok": False, "reason": "model-detail-unavailable", "trace": trace}
@@ -1668,12 +2591,13 @@ class TrendDeviceValuator(BaseValuator):
                 return {"ok": False, "reason": "characteristics-empty", "trace": trace}
 
             selected_characteristics: list[dict[str, Any]] = []
+            wizard_context = WizardContext.build(product, normalized_name)
             wizard_steps: list[dict[str, Any]] = [
                 {
                     "step": 1,
                     "step_type": STEP_DEVICE_FAMILY,
                     "selected": str(device.get("nome") or ""),
-                    "options_count": len([item for item in devices if isinstance(item, dict)]),
+                    "options_count": devices_count,
                     "confirmed": True,
                     "source": "api",
                 },
@@ -1681,7 +2605,7 @@ class TrendDeviceValuator(BaseValuator):
                     "step": 2,
                     "step_type": STEP_MODEL,
                     "selected": str(model.get("nome") or ""),
-                    "options_count": len([item for item in models if isinstance(item, dict)]),
+                    "options_count": len(model_rows),
                     "confirmed": True,
                     "source": "api",
                 },
@@ -1715,15 +2639,16 @@ class TrendDeviceValuator(BaseValuator):
                     options=wizard_options,
                     product=product,
                     normalized_name=normalized_name,
+                    context=wizard_context,
                 )
                 if chosen is None:
                     chosen = wizard_options[0]
                 option_payload = options_raw[chosen.index]
                 if not isinstance(option_payload, dict):
                     continue
-                characteristic_payload = dict(characteristic)
-                characteristic_payload["usato_opzioni"] = [dict(option_payload)]
-                selected_characteristics.append(characteristic_payload)
+                # Overlay literals: the source rows belong to the cached catalog and must stay untouched,
+                # while the chosen option is only serialized, never mutated, so it needs no copy.
+                selected_characteristics.append({**characteristic, "usato_opzioni": [option_payload]})
                 wizard_steps.append(
                     {
                         "step": step_index,
@@ -1738,23 +2663,18 @@ class TrendDeviceValuator(BaseValuator):
             if not selected_characteristics:
                 return {"ok": False, "reason": "no-characteristics-selected", "trace": trace}
 
-            model_payload = dict(model)
-            model_payload["options"] = selected_characteristics
-            device_payload = dict(device)
-            device_payload["models"] = [model_payload]
-            device_payload["options"] = None
+            device_payload = {
+                **device,
+                "models": [{**model, "options": selected_characteristics}],
+                "options": None,
+            }
 
-            for email in _trenddevice_api_email_candidates():
+            async def _attempt(email: str) -> tuple[dict[str, Any], int, dict[str, Any]] | None:
                 request_payload = {
                     "usatoDevice": device_payload,
                     "email": email,
                 }
-                post_data, post_meta = _trenddevice_api_request_json(
-                    method="POST",
-                    path="/vendi/usato",
-                    payload=request_payload,
-                    timeout_seconds=timeout_seconds,
-                )
+                post_data, post_meta = await _request("POST", "/vendi/usato", request_payload)
                 attempt_row = {
                     "email_domain": email.split("@")[-1],
                     "status": post_meta.get("status"),
@@ -1762,7 +2682,7 @@ class TrendDeviceValuator(BaseValuator):
                 }
                 trace["post_attempts"].append(attempt_row)
                 if not isinstance(post_data, dict):
-                    continue
+                    return None
 
                 richiesta = post_data.get("richiesta") if isinstance(post_data.get("richiesta"), dict) else {}
                 request_id = int(richiesta.get("id") or 0) if richiesta else 0
@@ -1770,15 +2690,11 @@ class TrendDeviceValuator(BaseValuator):
                 detail_meta_payload: dict[str, Any] = {}
                 detail_data = None
                 if stima is None and request_id > 0:
-                    detail_data, detail_meta_payload = _trenddevice_api_request_json(
-                        method="GET",
-                        path=f"/richiesta/{request_id}",
-                        timeout_seconds=timeout_seconds,
-                    )
+                    detail_data, detail_meta_payload = await _request("GET", f"/richiesta/{request_id}")
                     if isinstance(detail_data, dict):
                         stima = _trenddevice_api_extract_stima(detail_data)
                 if stima is None:
-                    continue
+                    return None
 
                 td_money = None
                 if isinstance(richiesta, dict):
@@ -1799,11 +2715,8 @@ class TrendDeviceValuator(BaseValuator):
                 source_url = f"{self.base_url}?model={model_id}&request={request_id}" if request_id > 0 else f"{self.base_url}?model={model_id}"
                 device_label = _normalize_wizard_text(str(device.get("nome") or "")).replace(" ", "+")
                 model_label = _normalize_wizard_text(str(model.get("nome") or "")).replace(" ", "+")
-                validation_url = f"{_trenddevice_api_base_url()}/vendi/usato/{model_id}?device={device_label}&model={model_label}"
-                trace["selected"]["request_id"] = request_id
-                if detail_meta_payload:
-                    trace["richiesta_detail"] = detail_meta_payload
-                return {
+                validation_url = f"{base_url}/vendi/usato/{model_id}?device={device_label}&model={model_label}"
+                result = {
                     "ok": True,
                     "offer": stima,
                     "price_text": price_text,
@@ -1813,9 +2726,24 @@ class TrendDeviceValuator(BaseValuator):
                     "wizard": wizard_steps,
                     "trace": trace,
                 }
+                return result, request_id, detail_meta_payload
+
+            # Every POST registers a lead with TrendDevice, and a cancelled request may already have
+            # reached the server, so emails are tried strictly one after another under the shared deadline.
+            for email in _trenddevice_api_email_candidates():
+                if _trenddevice_api_request_budget(deadline, timeout_seconds) is None:
+                    return {"ok": False, "reason": "api-budget-exhausted", "trace": trace}
+                outcome = await _attempt(email)
+                if outcome is None:
+                    continue
+                result, request_id, detail_meta_payload = outcome
+                trace["selected"]["request_id"] = request_id
+                if detail_meta_payload:
+                    trace["richiesta_detail"] = detail_meta_payload
+                return result
             return {"ok": False, "reason": "post-no-stima", "trace": trace}
 
-        result = await asyncio.to_thread(_run)
+        result = await _run()
         trace = result.get("trace") if isinstance(result, dict) else {}
         payload["api"] = trace if isinstance(trace, dict) else {}
         if not isinstance(result, dict) or not result.get("ok"):
@@ -1883,9 +2811,21 @@ class TrendDeviceValuator(BaseValuator):
         if api_offer is not None:
             return api_offer, api_source_url or self.base_url, payload
 
-        storage_state_path = _load_storage_state_b64()
+        profile_dir = _persistent_profile_dir()
+        if profile_dir is not None:
+            # The profile keeps cookies, cache and service workers itself: no state files to load or save.
+            storage_state_path = None
+            session_state_path = None
+            session_state_loaded = _profile_session_ready(profile_dir)
+            payload["persistent_profile"] = True
+        else:
+            storage_state_path = _load_storage_state_b64()
+            # A logged-in B64 state is never copied into the session file.
+            session_state_path = _session_state_path() if storage_state_path is None else None
+            session_state_loaded = session_state_path is not None and os.path.isfile(session_state_path)
         payload["storage_state"] = bool(storage_state_path)
-        if _use_storage_state() and storage_state_path is None:
+        payload["session_state"] = session_state_loaded
+        if profile_dir is None and _use_storage_state() and storage_state_path is None and not session_state_loaded:
             payload["storage_state_error"] = _TRENDDEVICE_STORAGE_STATE_ERROR or "missing"
             print(
                 "[trenddevice] storage_state missing/invalid | "
@@ -1893,141 +2833,62 @@ class TrendDeviceValuator(BaseValuator):
             )
         email_gate_wait_ms = max(1500, int(_env_or_default("TRENDDEVICE_EMAIL_GATE_WAIT_MS", "6500")))
 
-        async with async_playwright() as playwright:
-            browser = await playwright.chromium.launch(headless=self.headless)
-            context_kwargs: dict[str, Any] = {"locale": "it-IT"}
-            if storage_state_path:
-                context_kwargs["storage_state"] = storage_state_path
-            context = await browser.new_context(**context_kwargs)
+        if profile_dir is not None:
+            shared = _shared_persistent_context(headless=self.headless, user_data_dir=profile_dir)
+        else:
+            shared = _shared_chromium(headless=self.headless)
+        async with shared as handle:
+            if profile_dir is not None:
+                context = handle
+            else:
+                context_kwargs: dict[str, Any] = {"locale": "it-IT"}
+                if storage_state_path:
+                    context_kwargs["storage_state"] = storage_state_path
+                elif session_state_loaded:
+                    context_kwargs["storage_state"] = session_state_path
+                context = await handle.new_context(**context_kwargs)
             page = await context.new_page()
+            # Opt-in: routing every request disables Chromium's HTTP cache for this page.
+            if _block_media_enabled():
+                await page.route("**/*", _abort_heavy_asset)
+                payload["media_blocked"] = True
             page.set_default_timeout(self.nav_timeout_ms)
-            network_price_candidates: list[dict[str, Any]] = []
-            response_tasks: set[asyncio.Task[Any]] = set()
-            wizard_progress = 0
-
-            async def _capture_response_body(response) -> None:  # noqa: ANN001
-                url = str(getattr(response, "url", "") or "")
-                url_lower = url.lower()
-                headers = getattr(response, "headers", {}) or {}
-                content_type = str(headers.get("content-type", "")).lower()
-                request = getattr(response, "request", None)
-                resource_type = str(getattr(request, "resource_type", "")).lower()
-                if "trendevice.com" not in url_lower:
-                    return
-                interesting_url = any(
-                    token in url_lower
-                    for token in ("valut", "offer", "offert", "quote", "quotazione", "/api/", "graphql", "vendi")
-                )
-                if not interesting_url and not any(token in content_type for token in ("json", "text", "javascript")):
-                    return
-                try:
-                    body = await response.text()
-                except Exception:
-                    return
-                if not body:
-                    return
-                trimmed = body[:120000]
-                local_candidates: list[dict[str, Any]] = []
-
-                contextual_value, contextual_snippet = _extract_contextual_price(trimmed)
-                if contextual_value is not None:
-                    local_candidates.append(
-                        {
-                            "score": 68,
-                            "value": contextual_value,
-                            "snippet": contextual_snippet,
-                            "source": "context",
-                        }
-                    )
-                for score, value, snippet in _extract_keyed_prices_from_text(trimmed):
-                    local_candidates.append(
-                        {
-                            "score": score,
-                            "value": value,
-                            "snippet": snippet,
-                            "source": "keyword",
-                        }
-                    )
+            capture = ResponseCaptureState()
+            network_price_candidates = capture.candidates
 
-                parsed_json = None
-                body_stripped = trimmed.strip()
-                if (
-                    "json" in content_type
-                    or body_stripped.startswith("{")
-                    or body_stripped.startswith("[")
-                ):
-                    try:
-                        parsed_json = json.loads(body_stripped)
-                    except Exception:
-                        parsed_json = None
-                if parsed_json is not None:
-                    for score, value, snippet in _extract_prices_from_json_blob(parsed_json):
-                        local_candidates.append(
-                            {
-                                "score": score,
-                                "value": value,
-                                "snippet": snippet,
-                                "source": "json",
-                            }
-                        )
-
-                if not local_candidates:
-                    return
-
-                ranked = sorted(local_candidates, key=lambda item: (int(item["score"]), float(item["value"])), reverse=True)
-                for candidate in ranked[:3]:
-                    row = {
-                        "url": url,
-                        "status": getattr(response, "status", None),
-                        "content_type": content_type[:60],
-                        "score": int(candidate["score"]),
-                        "value": float(candidate["value"]),
-                        "snippet": str(candidate["snippet"])[:260],
-                        "source": candidate["source"],
-                        "wizard_progress": wizard_progress,
-                    }
-                    if not _is_credible_network_candidate(row):
-                        continue
-                    network_price_candidates.append(row)
-                if len(network_price_candidates) > 40:
-                    del network_price_candidates[:-40]
-
-            def _on_response(response) -> None:  # noqa: ANN001
-                task = asyncio.create_task(_capture_response_body(response))
-                response_tasks.add(task)
-                task.add_done_callback(lambda done: response_tasks.discard(done))
-
-            async def _drain_response_tasks() -> None:
-                if not response_tasks:
-                    return
-                await asyncio.gather(*tuple(response_tasks), return_exceptions=True)
-
-            page.on("response", _on_response)
+            page.on("response", partial(_on_response, capture=capture))
+            run_failed = False
             try:
                 await page.goto(self.base_url, wait_until="domcontentloaded")
-                hostname = (urlparse(page.url).hostname or "").lower()
+                landed_url = page.url
+                hostname = _url_hostname(landed_url)
                 if "trendevice.com" not in hostname:
                     raise ValuatorRuntimeError(
                         f"Unexpected TrendDevice hostname: {hostname or 'n/a'}",
                         payload=payload,
-                        source_url=page.url,
+                        source_url=landed_url,
                     )
 
-                await self._accept_cookie_if_present(page)
-                await self._click_first(
-                    page,
-                    [
-                        "button:has-text('Accetta tutti')",
-                        "button:has-text('Accetta')",
-                    ],
-                    timeout_ms=3500,
-                )
-                await page.wait_for_timeout(800)
+                # A session saved by a previous run already carries the cookie consent; the
+                # no-options fallback below still clicks the banner if it reappears.
+                if not session_state_loaded:
+                    await self._accept_cookie_if_present(page)
+                    await self._click_first(
+                        page,
+                        [
+                            "button:has-text('Accetta tutti')",
+                            "button:has-text('Accetta')",
+                        ],
+                        timeout_ms=3500,
+                    )
+                    # Short settle only: _wait_for_wizard_options polls for the options right after.
+                    await page.wait_for_timeout(200)
 
-                previous_signature = ""
+                previous_signature: tuple[str, ...] = ()
                 stagnant_steps = 0
                 max_steps = 18
                 excluded_models: set[str] = set()
+                wizard_context = WizardContext.build(product, normalized_name)
                 reset_after_model = 0
                 for step_index in range(1, max_steps + 1):
                     options = await self._wait_for_wizard_options(page)
@@ -2040,16 +2901,16 @@ class TrendDeviceValuator(BaseValuator):
                             ],
                             timeout_ms=1800,
                         )
-                        await page.wait_for_timeout(900)
+                        await page.wait_for_timeout(200)
                         options = await self._wait_for_wizard_options(page, timeout_ms=3500)
                         if not options:
                             submitted_email = await self._submit_email_gate(page, payload)
                             if submitted_email:
                                 payload["wizard_end_reason"] = "email-gate-submitted"
-                                await page.wait_for_timeout(email_gate_wait_ms)
+                                await self._wait_for_quote(page, capture, email_gate_wait_ms)
                                 options = await self._wait_for_wizard_options(page, timeout_ms=max(2200, email_gate_wait_ms // 2))
                                 if not options:
-                                    await _drain_response_tasks()
+                                    await _drain_response_tasks(capture)
                                     price, price_text = await self._extract_price(page, payload=payload)
                                     if price is not None:
                                         payload["price_source"] = "dom-post-email"
@@ -2098,14 +2959,14 @@ class TrendDeviceValuator(BaseValuator):
                                 )
                                 break
 
-                    step_name = _detect_wizard_step(options)
                     signature = _options_signature(options)
+                    step_name = _detect_wizard_step_for_values(signature)
                     if signature == previous_signature:
                         stagnant_steps += 1
                     else:
                         stagnant_steps = 0
                     previous_signature = signature
-                    if stagnant_steps >= 1 and step_name in {STEP_MARKET, STEP_COLOR, STEP_YES_NO}:
+                    if stagnant_steps >= 1 and step_name in WIZARD_FINALIZE_STEPS:
                         # Some final steps render "Valuta" instead of "Conferma".
                         if await self._click_confirm(page):
                             payload["wizard"].append(
@@ -2117,14 +2978,14 @@ class TrendDeviceValuator(BaseValuator):
                                     "confirmed": True,
                                 }
                             )
-                            await page.wait_for_timeout(1200)
+                            await self._wait_for_wizard_transition(page, signature)
                             continue
                     if stagnant_steps >= 2:
                         submitted_email = await self._submit_email_gate(page, payload)
                         if submitted_email:
                             payload["wizard_end_reason"] = "email-gate-submitted-stagnant"
-                            await page.wait_for_timeout(email_gate_wait_ms)
-                            await _drain_response_tasks()
+                            await self._wait_for_quote(page, capture, email_gate_wait_ms)
+                            await _drain_response_tasks(capture)
                             price, price_text = await self._extract_price(page, payload=payload)
                             if price is not None:
                                 payload["price_source"] = "dom-post-email-stagnant"
@@ -2181,7 +3042,7 @@ class TrendDeviceValuator(BaseValuator):
                                 payload.setdefault("adaptive_fallbacks", {})["excluded_model_on_reset"] = failing_model
                             if reset_after_model >= 3:
                                 payload["wizard_end_reason"] = "model-selection-reset"
-                                await _drain_response_tasks()
+                                await _drain_response_tasks(capture)
                                 price, price_text = await self._extract_price(page, payload=payload)
                                 if price is not None:
                                     payload["price_source"] = "dom-pre-reset"
@@ -2222,12 +3083,13 @@ class TrendDeviceValuator(BaseValuator):
                         product=product,
                         normalized_name=normalized_name,
                         excluded_models=excluded_models,
+                        context=wizard_context,
                     )
                     if not chosen:
                         payload["wizard_end_reason"] = f"no-choice-{step_name}"
                         break
 
-                    wizard_progress = step_index
+                    capture.wizard_progress = step_index
                     await self._select_option(page, chosen)
                     confirmed = await self._click_confirm(page)
                     payload["wizard"].append(
@@ -2240,17 +3102,16 @@ class TrendDeviceValuator(BaseValuator):
                         }
                     )
 
-                    await page.wait_for_timeout(1100)
+                    await self._wait_for_wizard_transition(page, signature)
 
-                if response_tasks:
-                    await _drain_response_tasks()
+                await _drain_response_tasks(capture)
 
                 if network_price_candidates:
-                    payload["network_price_candidates"] = network_price_candidates[-12:]
+                    payload["network_price_candidates"] = [item.as_dict() for item in list(network_price_candidates)[-12:]]
 
                 price, price_text = await self._extract_price(page, payload=payload)
                 if price is None:
-                    await _drain_response_tasks()
+                    await _drain_response_tasks(capture)
                     network_price, network_snippet = _pick_best_network_candidate(
                         network_price_candidates,
                         normalized_name=normalized_name,
@@ -2291,12 +3152,21 @@ class TrendDeviceValuator(BaseValuator):
                     payload=payload,
                 )
                 return price, page.url, payload
+            except BaseException:
+                run_failed = True
+                raise
             finally:
-                if response_tasks:
-                    await _drain_response_tasks()
-                await context.close()
-                await browser.close()
-                _remove_file_if_exists(storage_state_path)
+                await _drain_response_tasks(capture)
+                await _stop_response_workers(capture)
+                # Only a run that returned a validated quote (hence on the TrendDevice host) may
+                # seed the next one; failed or mismatched runs could leave a partial state behind.
+                if session_state_path is not None and not run_failed:
+                    await _save_session_state(context, session_state_path)
+                if profile_dir is not None:
+                    _mark_profile_session(profile_dir, not run_failed)
+                    await page.close()
+                else:
+                    await context.close()
 
 
 __all__ = [
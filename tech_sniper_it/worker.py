@@ -18,6 +18,7 @@ from tech_sniper_it.manager import build_default_manager, get_strategy_profile_s
 from tech_sniper_it.models import AmazonProduct, ProductCategory, to_legacy_storage_category
 from tech_sniper_it.sources import apply_cart_net_pricing, fetch_amazon_warehouse_products
 from tech_sniper_it.utils import infer_amazon_warehouse_condition
+from tech_sniper_it.valuators import TrendDeviceValuator
 
 
 MAX_LAST_LIMIT = 10
@@ -2942,7 +2943,7 @@ async def _run_last_command(payload: dict[str, Any]) -> int:
     return 0
 
 
-async def run_worker() -> int:
+async def _dispatch_command() -> int:
     load_dotenv()
     event_data = _load_github_event_data()
     payload = _get_client_payload(event_data)
@@ -2959,6 +2960,14 @@ async def run_worker() -> int:
     return await _run_scan_command(payload)
 
 
+async def run_worker() -> int:
+    try:
+        return await _dispatch_command()
+    finally:
+        # TrendDevice keeps a process-wide HTTP client and Chromium alive across valuations.
+        await TrendDeviceValuator.aclose()
+
+
 def main() -> None:
     raise SystemExit(asyncio.run(run_worker()))
 
@@ -198,3 +198,37 @@ async def test_collect_ui_probe_reports_no_drift_when_keywords_present() -> None
         min_hits=2,
     )
     assert probe["drift_suspected"] is False
+
+
+@pytest.mark.asyncio
+async def test_click_first_tries_present_selectors_before_waiting_on_absent_ones() -> None:
+    present = {"#late": 1}
+    clicked: list[str] = []
+    waited: list[str] = []
+
+    class _Locator:
+        def __init__(self, selector: str) -> None:
+            self.selector = selector
+            self.first = self
+
+        async def count(self) -> int:
+            if self.selector == "#broken":
+                raise RuntimeError("bad selector")
+            return present.get(self.selector, 0)
+
+        async def wait_for(self, state: str, timeout: int) -> None:  # noqa: ARG002
+            waited.append(self.selector)
+
+        async def click(self, timeout: int) -> None:  # noqa: ARG002
+            clicked.append(self.selector)
+
+    class _Page:
+        def locator(self, selector: str) -> _Locator:
+            return _Locator(selector)
+
+    valuator = DummySuccessValuator()
+    page = _Page()
+    assert await valuator._present_selectors(page, ["#missing", "#broken", "#late"]) == ["#late"]
+    assert await valuator._click_first(page, ["#missing", "#broken", "#late"], timeout_ms=10) is True
+    assert waited == ["#late"]
+    assert clicked == ["#late"]
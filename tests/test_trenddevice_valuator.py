@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
+import os
 
+import httpx
 import pytest
 
 from tech_sniper_it.models import AmazonProduct, ProductCategory
+from tech_sniper_it.valuators import trenddevice
 from tech_sniper_it.valuators.trenddevice import (
     STEP_BATTERY,
     STEP_CAPACITY,
@@ -16,6 +20,7 @@ from tech_sniper_it.valuators.trenddevice import (
     STEP_MODEL,
     STEP_SIM,
     STEP_YES_NO,
+    TrendDeviceValuator,
     WizardOption,
     _assess_trenddevice_match,
     _detect_wizard_step,
@@ -23,9 +28,11 @@ from tech_sniper_it.valuators.trenddevice import (
     _extract_keyed_prices_from_text,
     _extract_iphone_model_hint,
     _extract_prices_from_json_blob,
+    _is_capturable_response,
     _is_credible_network_candidate,
     _is_email_gate_text,
     _load_storage_state_b64,
+    _may_contain_price_keys,
     _normalize_wizard_text,
     _parse_plain_price,
     _pick_best_network_candidate,
@@ -33,9 +40,13 @@ from tech_sniper_it.valuators.trenddevice import (
     _remove_file_if_exists,
     _trenddevice_api_extract_stima,
     _trenddevice_api_option_name,
+    _trenddevice_api_device_index,
     _trenddevice_api_pick_device,
     _trenddevice_api_pick_model,
+    _trenddevice_api_request_budget,
+    _trenddevice_api_request_json,
     _trenddevice_api_step_type,
+    _url_hostname,
 )
 
 
@@ -43,6 +54,12 @@ def test_normalize_wizard_text_compacts_and_lowercases() -> None:
     assert _normalize_wizard_text("  iPhone 14 Pro, 128GB  ") == "iphone 14 pro 128gb"
 
 
+def test_normalize_wizard_text_handles_empty_and_uncached_long_input() -> None:
+    assert _normalize_wizard_text(None) == ""
+    long_text = "Ti offriamo:  " + ("Valutazione  " * 40)
+    assert _normalize_wizard_text(long_text) == "ti offriamo " + " ".join(["valutazione"] * 40)
+
+
 def test_extract_iphone_model_hint_prefers_model_and_variant() -> None:
     assert _extract_iphone_model_hint("Apple iPhone 14 Pro Max 128GB Nero") == "14 pro max"
     assert _extract_iphone_model_hint("Apple iPhone 15 128GB") == "15"
@@ -95,6 +112,11 @@ def test_detect_wizard_step_device_family() -> None:
     assert _detect_wizard_step(options) == STEP_DEVICE_FAMILY
 
 
+def test_detect_wizard_step_counts_repeated_family_labels_once() -> None:
+    assert trenddevice._detect_wizard_step_for_values(("samsung", "samsung", "modello x")) != STEP_DEVICE_FAMILY
+    assert trenddevice._detect_wizard_step_for_values(("samsung", "google", "samsung")) == STEP_DEVICE_FAMILY
+
+
 def test_pick_model_prefers_exact_model_not_pro_max() -> None:
     product = AmazonProduct(
         title="Apple iPhone 14 Pro 128GB",
@@ -245,6 +267,20 @@ def test_extract_contextual_price_skips_non_offer_banner() -> None:
     assert value is None
 
 
+def test_extract_contextual_price_windows_survive_length_changing_lowercase() -> None:
+    # "İ".lower() is two characters, so window offsets no longer match the lowered text.
+    text = "İstanbul " * 20 + "Spedizione 9,90 € " + "x" * 120 + " Ti offriamo 412,99 € subito"
+    value, snippet = _extract_contextual_price(text)
+    assert value == 412.99
+    assert snippet.endswith("Ti offriamo 412,99 € subito")
+
+
+def test_html_may_contain_euro_covers_character_references() -> None:
+    for markup in ("<p>410 €</p>", "<p>410 &euro;</p>", "<p>410 &#8364;</p>", "<p>&#x20AC; 410</p>", "<p>&#128;</p>"):
+        assert trenddevice._html_may_contain_euro(markup)
+    assert not trenddevice._html_may_contain_euro("<p>&#1280; 410 EUR</p>")
+
+
 def test_is_email_gate_text_detects_lead_form_copy() -> None:
     text = (
         "Inserisci la tua mail e scopri quanto puoi guadagnare dal tuo dispositivo usato! "
@@ -262,6 +298,120 @@ def test_trenddevice_api_option_name_reads_nested_value() -> None:
     assert _trenddevice_api_option_name(option) == "128 GB"
 
 
+def test_json_loads_keeps_stdlib_only_literals() -> None:
+    assert trenddevice._json_loads('{"price": 315.5}') == {"price": 315.5}
+    assert trenddevice._json_loads(str(2**70)) == 2**70
+    assert trenddevice._json_loads("[NaN]")[0] != trenddevice._json_loads("[NaN]")[0]
+    with pytest.raises(ValueError):
+        trenddevice._json_loads("{not json")
+
+
+@pytest.mark.asyncio
+async def test_try_api_offer_waits_for_a_slow_lead_post_before_the_next_email(monkeypatch: pytest.MonkeyPatch) -> None:
+    posts: list[str] = []
+    post_devices: list[dict] = []
+    catalog_model = {"id": 7, "nome": "iPhone 14"}
+    capacity_option = {"usato_opzioni_valori": [{"nome": "128 GB"}]}
+
+    async def _fake_request_json(*, method: str, path: str, payload=None, timeout_seconds: float, base_url=None):  # noqa: ANN001, ANN202
+        if method == "GET" and path == "/vendi/usato":
+            return {"usatoDevice": [{"id": 1, "nome": "iPhone", "models": [catalog_model]}]}, {"ok": True}
+        if method == "GET":
+            return {"usatoDevice": [{"nome": "Capacità", "usato_opzioni": [capacity_option]}]}, {"ok": True}
+        posts.append(payload["email"])
+        post_devices.append(payload["usatoDevice"])
+        # Slow but successful: a second email would register a duplicate lead.
+        await asyncio.sleep(0.05)
+        return {"richiesta": {"id": 55, "stima": "300"}}, {"ok": True, "status": 200}
+
+    monkeypatch.setattr(trenddevice, "_trenddevice_api_request_json", _fake_request_json)
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_API_CATALOG_CACHE", {})
+    monkeypatch.delenv("TRENDDEVICE_LEAD_EMAIL", raising=False)
+    product = AmazonProduct(title="Apple iPhone 14 128GB", price_eur=520.0, category=ProductCategory.APPLE_PHONE)
+    payload: dict[str, object] = {}
+    offer, _source_url = await TrendDeviceValuator()._try_api_offer(
+        product=product,
+        normalized_name="iPhone 14 128GB",
+        payload=payload,
+    )
+    assert offer == 300.0
+    assert len(posts) == 1
+    assert payload["api"]["selected"]["request_id"] == 55
+    assert post_devices[0] == {
+        "id": 1,
+        "nome": "iPhone",
+        "models": [{"id": 7, "nome": "iPhone 14", "options": [{"nome": "Capacità", "usato_opzioni": [capacity_option]}]}],
+        "options": None,
+    }
+    assert catalog_model == {"id": 7, "nome": "iPhone 14"}
+
+
+def test_trenddevice_api_request_budget_caps_to_remaining_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(trenddevice.time, "monotonic", lambda: 100.0)
+    assert _trenddevice_api_request_budget(130.0, 18.0) == 18.0
+    assert _trenddevice_api_request_budget(105.0, 18.0) == 5.0
+    assert _trenddevice_api_request_budget(101.0, 18.0) is None
+
+
+@pytest.mark.asyncio
+async def test_trenddevice_api_request_json_reuses_client_and_reports_http_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    seen: list[tuple[str, str, bytes]] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.method, request.url.path, request.content))
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404, json={"error": "nope"})
+        return httpx.Response(200, json={"ok": 1})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_API_CLIENT", (asyncio.get_running_loop(), client))
+
+    data, meta = await _trenddevice_api_request_json(
+        method="post",
+        path="/vendi/usato",
+        payload={"email": "a@b.it"},
+        timeout_seconds=5,
+        base_url="https://api.example",
+    )
+    assert data == {"ok": 1}
+    assert meta == {"ok": True, "status": 200, "url": "https://api.example/vendi/usato"}
+
+    data, meta = await _trenddevice_api_request_json(
+        method="GET",
+        path="missing",
+        timeout_seconds=5,
+        base_url="https://api.example",
+    )
+    assert data is None
+    assert meta["status"] == 404
+    assert meta["json"] == {"error": "nope"}
+    assert seen[0][:2] == ("POST", "/vendi/usato")
+    assert json.loads(seen[0][2]) == {"email": "a@b.it"}
+    assert trenddevice._trenddevice_api_client() is client
+    await trenddevice.close_trenddevice_api_client()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_trenddevice_api_request_json_parses_body_bytes_leniently(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b'{"richiesta": {"stima": "410,00", "nota": "ok\xff"}}')
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_API_CLIENT", (asyncio.get_running_loop(), client))
+
+    data, meta = await _trenddevice_api_request_json(
+        method="GET",
+        path="richiesta/1",
+        timeout_seconds=5,
+        base_url="https://api.example",
+    )
+    assert meta["ok"] is True
+    assert data == {"richiesta": {"stima": "410,00", "nota": "ok"}}
+    assert _trenddevice_api_extract_stima(data) == 410.0
+    await trenddevice.close_trenddevice_api_client()
+
+
 def test_trenddevice_api_step_type_prefers_label_mapping() -> None:
     characteristic = {
         "usato_caratteristiche_valori": [{"nome": "Condizioni", "descrizione": "In che stato è il dispositivo?"}]
@@ -285,6 +435,17 @@ def test_trenddevice_api_pick_device_prefers_watch_for_smartwatch() -> None:
     assert picked.get("id") == 9
 
 
+def test_trenddevice_api_device_index_skips_unusable_rows() -> None:
+    devices = [
+        {"id": 1, "nome": "iPhone", "models": [{"id": 796, "nome": "14"}]},
+        {"id": 2, "nome": "iPad", "models": []},
+        {"id": 3, "nome": "", "models": [{"id": 5}]},
+        "broken",
+    ]
+    index = _trenddevice_api_device_index(devices)
+    assert [(name, row["id"]) for name, row in index] == [("iphone", 1)]
+
+
 def test_trenddevice_api_pick_model_prefers_exact_iphone_variant() -> None:
     models = [
         {"id": 784, "nome": "14 Pro Max"},
@@ -296,6 +457,14 @@ def test_trenddevice_api_pick_model_prefers_exact_iphone_variant() -> None:
     assert picked.get("id") == 788
 
 
+def test_model_score_floor_skips_ratio_only_for_options_that_cannot_win() -> None:
+    option = WizardOption(index=0, text="Galaxy S23", normalized="galaxy s23")
+    kwargs = {"model_hint": "14 pro", "normalized_name": "Apple iPhone 14 Pro 128GB"}
+    exact = trenddevice._model_score(option, **kwargs)
+    assert trenddevice._model_score(option, **kwargs, floor=exact - 1) == exact
+    assert trenddevice._model_score(option, **kwargs, floor=300) == 300
+
+
 def test_trenddevice_api_extract_stima_prefers_cash_quote() -> None:
     data = {"richiesta": {"stima": 250, "stima_money_td": 270}}
     assert _trenddevice_api_extract_stima(data) == 250.0
@@ -322,6 +491,30 @@ def test_extract_prices_from_json_blob_detects_nested_price_fields() -> None:
     assert 412.99 in values
 
 
+def test_is_capturable_response_skips_static_assets_and_foreign_hosts() -> None:
+    def _response(url: str, resource_type: str, content_type: str, content_length: str = "") -> object:
+        request = type("Req", (), {"resource_type": resource_type})()
+        headers = {"content-type": content_type, "content-length": content_length}
+        return type("Resp", (), {"url": url, "request": request, "headers": headers})()
+
+    assert _is_capturable_response(_response("https://www.trendevice.com/api/valutazione", "xhr", "application/json"))
+    assert not _is_capturable_response(_response("https://www.trendevice.com/img/offerta.png", "image", "image/png"))
+    assert not _is_capturable_response(_response("https://www.trendevice.com/vendi/style.css", "other", "text/css"))
+    assert not _is_capturable_response(_response("https://cdn.example.com/api/quote", "xhr", "application/json"))
+    assert not _is_capturable_response(
+        _response("https://analytics.example.com/collect?dl=https://www.trendevice.com/vendi/", "xhr", "text/plain")
+    )
+    assert _is_capturable_response(_response("https://www.trendevice.com/api/valutazione", "xhr", "application/json", "5120"))
+    assert not _is_capturable_response(
+        _response("https://www.trendevice.com/api/catalogo", "xhr", "application/json", "900000")
+    )
+
+
+def test_may_contain_price_keys_skips_payloads_without_price_fields() -> None:
+    assert _may_contain_price_keys('{"data": {"Quotazione": {"cash": 320}}}') is True
+    assert _may_contain_price_keys('{"menu": [{"label": "Vendi"}, {"label": "Ricondizionati"}]}') is False
+
+
 def test_pick_best_network_candidate_prefers_high_score_then_value() -> None:
     value, snippet = _pick_best_network_candidate(
         [
@@ -450,6 +643,51 @@ def test_assess_trenddevice_match_accepts_api_style_spacing_and_series_aliases()
     assert match["ok"] is True
 
 
+def test_assess_trenddevice_match_reports_real_similarity_on_rejections() -> None:
+    product = AmazonProduct(
+        title="Sony Alpha 7 IV Body",
+        price_eur=1999.0,
+        category=ProductCategory.PHOTOGRAPHY,
+    )
+    generic = _assess_trenddevice_match(
+        product=product,
+        normalized_name=product.title,
+        wizard_steps=[{"step_type": STEP_DEVICE_FAMILY, "selected": "Galaxy"}],
+        source_url="https://www.trendevice.com/vendi/",
+        price_text="Ti offriamo 80,00 €",
+    )
+    assert (generic["reason"], generic["score"], generic["ratio"]) == ("generic-url-no-model-step", -24, 0.24)
+    low = _assess_trenddevice_match(
+        product=product,
+        normalized_name=product.title,
+        wizard_steps=[{"step_type": STEP_MODEL, "selected": "Galaxy"}],
+        source_url="https://www.trendevice.com/vendi/galaxy/",
+        price_text="Ti offriamo 80,00 €",
+    )
+    assert (low["reason"], low["score"], low["ratio"]) == ("low-token-similarity", 35, 0.211)
+    assert low["required_tokens"] == ["sony", "alpha", "iv", "body"]
+
+
+def test_assess_trenddevice_match_reuses_cached_assessment_as_independent_copies() -> None:
+    product = AmazonProduct(
+        title="Apple iPhone 15 Pro 256GB",
+        price_eur=999.0,
+        category=ProductCategory.APPLE_PHONE,
+    )
+    kwargs = {
+        "product": product,
+        "normalized_name": product.title,
+        "wizard_steps": [{"step_type": STEP_MODEL, "selected": "iPhone 15 Pro"}, "ignored"],
+        "source_url": "https://www.trendevice.com/vendi/valutazione/iphone-15-pro",
+        "price_text": "Ti offriamo 610,00 €",
+    }
+    first = _assess_trenddevice_match(**kwargs)
+    first["hit_tokens"].append("mutated")
+    second = _assess_trenddevice_match(**kwargs)
+    assert "mutated" not in second["hit_tokens"]
+    assert second == {**first, "hit_tokens": second["hit_tokens"]}
+
+
 def test_assess_trenddevice_match_rejects_ultra_generation_mismatch() -> None:
     product = AmazonProduct(
         title="Apple Watch Ultra GPS + Cellular 49mm",
@@ -468,6 +706,10 @@ def test_assess_trenddevice_match_rejects_ultra_generation_mismatch() -> None:
     )
     assert match["ok"] is False
     assert match["reason"] == "model-generation-mismatch"
+    assert isinstance(match["score"], int)
+    assert isinstance(match["ratio"], float) and isinstance(match["token_ratio"], float)
+    assert "ultra" in match["hit_tokens"]
+    assert match["required_tokens"]
 
 
 def test_assess_trenddevice_match_accepts_watch_material_descriptor_gap() -> None:
@@ -490,6 +732,13 @@ def test_assess_trenddevice_match_accepts_watch_material_descriptor_gap() -> Non
     assert match["ok"] is True
 
 
+def test_url_hostname_matches_urlparse_for_navigation_urls() -> None:
+    assert _url_hostname("https://www.TrenDevice.com/vendi/valutazione/?step=2") == "www.trendevice.com"
+    assert _url_hostname("https://user:pw@trendevice.com:443#top") == "trendevice.com"
+    assert _url_hostname("about:blank") == ""
+    assert _url_hostname(None) == ""
+
+
 def test_load_storage_state_b64_decodes_valid_json(monkeypatch: pytest.MonkeyPatch) -> None:
     raw = json.dumps({"cookies": [], "origins": []}, ensure_ascii=False).encode("utf-8")
     encoded = base64.b64encode(raw).decode("ascii")
@@ -506,6 +755,24 @@ def test_load_storage_state_b64_decodes_valid_json(monkeypatch: pytest.MonkeyPat
         _remove_file_if_exists(path)
 
 
+def test_load_storage_state_b64_materializes_once_per_blob(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TRENDDEVICE_USE_STORAGE_STATE", "true")
+    monkeypatch.setenv("TRENDDEVICE_STORAGE_STATE_B64", '{"cookies":[],"origins":[]}')
+    path = _load_storage_state_b64()
+    assert path is not None
+    assert _load_storage_state_b64() == path
+
+    monkeypatch.setenv("TRENDDEVICE_STORAGE_STATE_B64", '{"cookies":[{"name":"a"}],"origins":[]}')
+    rotated = _load_storage_state_b64()
+    assert rotated is not None and rotated != path
+    # A valuation that already resolved the old path may still be opening its context.
+    assert os.path.exists(path)
+
+    trenddevice._remove_storage_state_file()
+    assert not os.path.exists(path)
+    assert not os.path.exists(rotated)
+
+
 def test_load_storage_state_b64_returns_none_on_invalid_payload(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("TRENDDEVICE_USE_STORAGE_STATE", "true")
     monkeypatch.setenv("TRENDDEVICE_STORAGE_STATE_B64", "not-base64")
@@ -524,3 +791,471 @@ def test_load_storage_state_b64_accepts_raw_json(monkeypatch: pytest.MonkeyPatch
         assert loaded.get("cookies") == []
     finally:
         _remove_file_if_exists(path)
+
+
+@pytest.mark.asyncio
+async def test_collect_wizard_options_reads_each_selector_in_one_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    rows_by_selector = {
+        "label": ["  iPhone\n14 ", None, "iPhone 14", "x", "iPhone 15"],
+        "[role='radio']": ["iPhone 15", "iPad"],
+        "div[role='option']": [],
+    }
+    calls: list[str] = []
+    in_flight = 0
+    peak = 0
+
+    class _FakeLocator:
+        def __init__(self, selector: str) -> None:
+            self.selector = selector
+
+        async def evaluate_all(self, script: str, limit: int) -> list[str | None]:
+            nonlocal in_flight, peak
+            calls.append(self.selector)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            if self.selector.startswith("div"):
+                raise trenddevice.PlaywrightError("detached")
+            return rows_by_selector[self.selector][:limit]
+
+    class _FakePage:
+        def locator(self, selector: str) -> _FakeLocator:
+            return _FakeLocator(selector)
+
+    monkeypatch.setattr(TrendDeviceValuator, "_selector_candidates", lambda self, **kwargs: list(rows_by_selector))
+    options = await TrendDeviceValuator()._collect_wizard_options(_FakePage())
+    assert calls == ["label", "[role='radio']", "div[role='option']"]
+    assert peak == 3
+    assert [(item.selector, item.index, item.text) for item in options] == [
+        ("label", 0, "iPhone 14"),
+        ("label", 4, "iPhone 15"),
+        ("[role='radio']", 1, "iPad"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_wizard_transition_returns_when_options_change(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _FakePage:
+        def __init__(self) -> None:
+            self.waits: list[int] = []
+
+        async def wait_for_timeout(self, timeout_ms: int) -> None:
+            self.waits.append(timeout_ms)
+
+    snapshots = [
+        [WizardOption(index=0, text="128 GB", normalized="128 gb")],
+        [WizardOption(index=0, text="Perfetto", normalized="perfetto")],
+    ]
+
+    async def _fake_collect(self, page):  # noqa: ANN001
+        return snapshots.pop(0)
+
+    monkeypatch.setattr(TrendDeviceValuator, "_collect_wizard_options", _fake_collect)
+    page = _FakePage()
+    await TrendDeviceValuator()._wait_for_wizard_transition(page, ("128 gb",), timeout_ms=5000)
+    assert page.waits == [200, 150]
+    assert snapshots == []
+
+
+@pytest.mark.asyncio
+async def test_is_email_gate_probes_inputs_and_ctas_together() -> None:
+    counts = {"input[name*='mail' i]": 1, "button:has-text('Scopri')": 1}
+    probed: list[str] = []
+
+    class _FakeLocator:
+        def __init__(self, selector: str) -> None:
+            self.selector = selector
+            self.first = self
+
+        async def count(self) -> int:
+            probed.append(self.selector)
+            return counts.get(self.selector, 0)
+
+    class _FakePage:
+        def locator(self, selector: str) -> _FakeLocator:
+            return _FakeLocator(selector)
+
+        async def inner_text(self, selector: str, timeout: int) -> str:
+            return ""
+
+    valuator = TrendDeviceValuator()
+    assert await valuator._is_email_gate(_FakePage()) is True
+    assert len(probed) == 7
+
+    counts.pop("button:has-text('Scopri')")
+    assert await valuator._is_email_gate(_FakePage()) is False
+
+
+@pytest.mark.asyncio
+async def test_wait_for_quote_returns_once_the_quote_xhr_is_captured() -> None:
+    capture = trenddevice.ResponseCaptureState()
+
+    class _IdlePage:
+        # The document is already network-idle; the quote XHR lands ~1 s after the gate submit.
+        def __init__(self) -> None:
+            self.waits: list[int] = []
+
+        async def wait_for_load_state(self, state: str, timeout: int) -> None:
+            return None
+
+        async def wait_for_timeout(self, timeout_ms: int) -> None:
+            self.waits.append(timeout_ms)
+            if sum(self.waits) >= 1000 and not capture.candidates:
+                capture.candidates.append(
+                    trenddevice.NetworkPriceCandidate(score=80, value=410.0, snippet="ti offriamo 410", source="json")
+                )
+                capture.captured += 1
+
+    page = _IdlePage()
+    await TrendDeviceValuator()._wait_for_quote(page, capture, 6500)
+    assert capture.captured == 1
+    assert page.waits == [250, 250, 250, 250, 400]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_quote_falls_back_to_the_full_budget_without_a_capture() -> None:
+    class _Page:
+        def __init__(self) -> None:
+            self.waits: list[int] = []
+
+        async def wait_for_timeout(self, timeout_ms: int) -> None:
+            self.waits.append(timeout_ms)
+
+    page = _Page()
+    await TrendDeviceValuator()._wait_for_quote(page, trenddevice.ResponseCaptureState(), 1600)
+    assert sum(page.waits) == 1600
+
+
+@pytest.mark.asyncio
+async def test_shared_chromium_launches_once_for_concurrent_valuations(monkeypatch: pytest.MonkeyPatch) -> None:
+    launches: list[bool] = []
+    closed: list[str] = []
+
+    class _FakeBrowser:
+        def is_connected(self) -> bool:
+            return "browser" not in closed
+
+        async def close(self) -> None:
+            closed.append("browser")
+
+    class _FakeChromium:
+        async def launch(self, headless: bool = True):  # noqa: ANN201
+            launches.append(headless)
+            return _FakeBrowser()
+
+    class _FakePlaywrightContext:
+        async def __aenter__(self):  # noqa: ANN204
+            return type("P", (), {"chromium": _FakeChromium()})()
+
+        async def __aexit__(self, exc_type, exc, tb) -> bool:  # noqa: ANN001
+            closed.append("playwright")
+            return False
+
+    monkeypatch.setattr(trenddevice, "async_playwright", lambda: _FakePlaywrightContext())
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_SHARED_BROWSERS", {})
+    monkeypatch.setenv("TRENDDEVICE_BROWSER_IDLE_SECONDS", "0")
+
+    async def _use() -> object:
+        async with trenddevice._shared_chromium(headless=True) as browser:
+            await asyncio.sleep(0)
+            return browser
+
+    first, second = await asyncio.gather(_use(), _use())
+    assert first is second
+    assert launches == [True]
+    assert closed == ["browser", "playwright"]
+
+
+@pytest.mark.asyncio
+async def test_shared_chromium_stays_warm_between_sequential_valuations(monkeypatch: pytest.MonkeyPatch) -> None:
+    launches: list[bool] = []
+    closed: list[str] = []
+
+    class _FakeBrowser:
+        def is_connected(self) -> bool:
+            return "browser" not in closed
+
+        async def close(self) -> None:
+            closed.append("browser")
+
+    class _FakeChromium:
+        async def launch(self, headless: bool = True):  # noqa: ANN201
+            launches.append(headless)
+            return _FakeBrowser()
+
+    class _FakePlaywrightContext:
+        async def __aenter__(self):  # noqa: ANN204
+            return type("P", (), {"chromium": _FakeChromium()})()
+
+        async def __aexit__(self, exc_type, exc, tb) -> bool:  # noqa: ANN001
+            closed.append("playwright")
+            return False
+
+    monkeypatch.setattr(trenddevice, "async_playwright", lambda: _FakePlaywrightContext())
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_SHARED_BROWSERS", {})
+    monkeypatch.setenv("TRENDDEVICE_BROWSER_IDLE_SECONDS", "30")
+
+    async with trenddevice._shared_chromium(headless=True) as first:
+        pass
+    async with trenddevice._shared_chromium(headless=True) as second:
+        pass
+    assert first is second
+    assert launches == [True]
+    assert closed == []
+
+    await TrendDeviceValuator.aclose()
+    assert closed == ["browser", "playwright"]
+
+
+@pytest.mark.asyncio
+async def test_aclose_survives_playwright_driver_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    closed: list[str] = []
+
+    class _FakeBrowser:
+        def is_connected(self) -> bool:
+            return True
+
+        async def close(self) -> None:
+            closed.append("browser")
+
+    class _FakeChromium:
+        async def launch(self, headless: bool = True):  # noqa: ANN201
+            return _FakeBrowser()
+
+    class _BrokenPlaywrightContext:
+        async def __aenter__(self):  # noqa: ANN204
+            return type("P", (), {"chromium": _FakeChromium()})()
+
+        async def __aexit__(self, exc_type, exc, tb) -> bool:  # noqa: ANN001
+            closed.append("playwright")
+            raise RuntimeError("driver gone")
+
+    async def _failing_api_close() -> None:
+        closed.append("api")
+        raise RuntimeError("api close failed")
+
+    monkeypatch.setattr(trenddevice, "async_playwright", lambda: _BrokenPlaywrightContext())
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_SHARED_BROWSERS", {})
+    monkeypatch.setattr(trenddevice, "close_trenddevice_api_client", _failing_api_close)
+    monkeypatch.setenv("TRENDDEVICE_BROWSER_IDLE_SECONDS", "30")
+
+    async with trenddevice._shared_chromium(headless=True):
+        pass
+    await TrendDeviceValuator.aclose()
+    assert closed == ["api", "browser", "playwright"]
+
+
+@pytest.mark.asyncio
+async def test_shared_persistent_context_relaunches_after_profile_close(monkeypatch: pytest.MonkeyPatch) -> None:
+    launches: list[tuple[str, bool]] = []
+
+    class _FakeContext:
+        def __init__(self) -> None:
+            self.listeners: list = []
+
+        def on(self, event: str, callback) -> None:  # noqa: ANN001
+            assert event == "close"
+            self.listeners.append(callback)
+
+        async def close(self) -> None:
+            for callback in self.listeners:
+                callback(self)
+
+    class _FakeChromium:
+        async def launch_persistent_context(self, user_data_dir: str, **kwargs):  # noqa: ANN003, ANN201
+            launches.append((user_data_dir, kwargs["headless"]))
+            return _FakeContext()
+
+    class _FakePlaywrightContext:
+        async def __aenter__(self):  # noqa: ANN204
+            return type("P", (), {"chromium": _FakeChromium()})()
+
+        async def __aexit__(self, exc_type, exc, tb) -> bool:  # noqa: ANN001
+            return False
+
+    monkeypatch.setattr(trenddevice, "async_playwright", lambda: _FakePlaywrightContext())
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_SHARED_BROWSERS", {})
+    monkeypatch.setenv("TRENDDEVICE_BROWSER_IDLE_SECONDS", "30")
+
+    async with trenddevice._shared_persistent_context(headless=True, user_data_dir="/tmp/td-profile") as first:
+        pass
+    async with trenddevice._shared_persistent_context(headless=True, user_data_dir="/tmp/td-profile") as second:
+        await second.close()
+    async with trenddevice._shared_persistent_context(headless=True, user_data_dir="/tmp/td-profile") as third:
+        pass
+    assert first is second
+    assert third is not second
+    assert launches == [("/tmp/td-profile", True), ("/tmp/td-profile", True)]
+    await TrendDeviceValuator.aclose()
+
+
+def test_persistent_profile_dir_is_opt_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("TRENDDEVICE_PERSISTENT_PROFILE", raising=False)
+    assert trenddevice._persistent_profile_dir() is None
+    monkeypatch.setenv("TRENDDEVICE_PERSISTENT_PROFILE", "1")
+    monkeypatch.setenv("TRENDDEVICE_PROFILE_DIR", "/data/td-profile")
+    assert trenddevice._persistent_profile_dir() == "/data/td-profile"
+
+
+def test_profile_session_marker_tracks_the_last_run(tmp_path) -> None:
+    (tmp_path / "Default").mkdir()
+    assert trenddevice._profile_session_ready(str(tmp_path)) is False
+    trenddevice._mark_profile_session(str(tmp_path), True)
+    assert trenddevice._profile_session_ready(str(tmp_path)) is True
+    trenddevice._mark_profile_session(str(tmp_path), False)
+    assert trenddevice._profile_session_ready(str(tmp_path)) is False
+
+
+@pytest.mark.asyncio
+async def test_fetch_offer_api_hit_never_starts_playwright(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _fake_api_offer(self, **kwargs):  # noqa: ANN001, ANN003
+        return 135.0, "https://api.example/vendi/usato/1024"
+
+    def _fail_playwright():  # noqa: ANN202
+        raise AssertionError("playwright should not start on an API hit")
+
+    monkeypatch.setattr(TrendDeviceValuator, "_try_api_offer", _fake_api_offer)
+    monkeypatch.setattr(trenddevice, "async_playwright", _fail_playwright)
+    monkeypatch.setattr(trenddevice, "_TRENDDEVICE_SHARED_BROWSERS", {})
+    product = AmazonProduct(title="Apple Watch Series 9 45mm", price_eur=279.0, category=ProductCategory.SMARTWATCH)
+    offer, source_url, payload = await TrendDeviceValuator()._fetch_offer(product, product.title)
+    assert offer == 135.0
+    assert source_url == "https://api.example/vendi/usato/1024"
+    assert "storage_state" not in payload
+    assert trenddevice._TRENDDEVICE_SHARED_BROWSERS == {}
+
+
+@pytest.mark.asyncio
+async def test_abort_heavy_asset_blocks_media_but_keeps_stylesheets(monkeypatch: pytest.MonkeyPatch) -> None:
+    handled: list[tuple[str, str]] = []
+
+    class _FakeRoute:
+        def __init__(self, resource_type: str) -> None:
+            self.request = type("Req", (), {"resource_type": resource_type})()
+
+        async def abort(self) -> None:
+            handled.append((self.request.resource_type, "abort"))
+
+        async def continue_(self) -> None:
+            handled.append((self.request.resource_type, "continue"))
+
+    for resource_type in ("image", "font", "media", "stylesheet", "xhr", "document"):
+        await trenddevice._abort_heavy_asset(_FakeRoute(resource_type))
+    assert handled == [
+        ("image", "abort"),
+        ("font", "abort"),
+        ("media", "abort"),
+        ("stylesheet", "continue"),
+        ("xhr", "continue"),
+        ("document", "continue"),
+    ]
+    monkeypatch.delenv("TRENDDEVICE_BLOCK_MEDIA", raising=False)
+    assert trenddevice._block_media_enabled() is False
+    monkeypatch.setenv("TRENDDEVICE_BLOCK_MEDIA", "1")
+    assert trenddevice._block_media_enabled() is True
+
+
+@pytest.mark.asyncio
+async def test_capture_response_body_records_credible_json_quote() -> None:
+    class _FakeResponse:
+        url = "https://www.trendevice.com/api/valutazione"
+        status = 200
+        headers = {"content-type": "application/json"}
+        request = type("Req", (), {"resource_type": "xhr"})()
+
+        async def body(self) -> bytes:
+            return json.dumps({"valutazione": {"offerta": {"amount": 315}}}).encode()
+
+    capture = trenddevice.ResponseCaptureState(wizard_progress=4)
+    trenddevice._on_response(_FakeResponse(), capture)
+    await trenddevice._drain_response_tasks(capture)
+    assert capture.queue.empty()
+    assert len(capture.workers) == trenddevice.RESPONSE_CAPTURE_WORKERS
+    await trenddevice._stop_response_workers(capture)
+    assert capture.workers == []
+    assert [(row.source, row.value, row.wizard_progress) for row in capture.candidates] == [("json", 315.0, 4)]
+
+    trenddevice._on_response(_FakeResponse(), capture)
+    assert capture.workers == []
+    assert capture.queue.empty()
+
+
+def test_scan_response_body_sniffs_json_from_raw_bytes() -> None:
+    body = json.dumps({"valutazione": {"offerta": {"amount": 315}}, "nota": "è già"}).encode()
+    rows = trenddevice._scan_response_body(b"\n  " + body, "text/plain")
+    assert (72, 315.0, "valutazione.offerta.amount=315", trenddevice.NETWORK_SOURCE_JSON) in rows
+    oversized = b"[" + b" " * trenddevice.NETWORK_SCAN_MAX_BYTES + body + b"]"
+    assert all(row[3] != trenddevice.NETWORK_SOURCE_JSON for row in trenddevice._scan_response_body(oversized, "application/json"))
+
+
+@pytest.mark.asyncio
+async def test_capture_response_body_reuses_scan_for_identical_bodies(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _FakeResponse:
+        url = "https://www.trendevice.com/api/valutazione"
+        status = 200
+        headers = {"content-type": "application/json"}
+
+        def __init__(self, amount: int) -> None:
+            self.amount = amount
+
+        async def body(self) -> bytes:
+            return json.dumps({"valutazione": {"offerta": {"amount": self.amount}}}).encode()
+
+    scans: list[bytes] = []
+    original_scan = trenddevice._scan_response_body
+
+    def _counting_scan(raw: bytes, content_type: str):  # noqa: ANN202
+        scans.append(raw)
+        return original_scan(raw, content_type)
+
+    monkeypatch.setattr(trenddevice, "_scan_response_body", _counting_scan)
+    capture = trenddevice.ResponseCaptureState()
+    for amount in (315, 315, 320):
+        await trenddevice._capture_response_body(_FakeResponse(amount), capture)
+    assert len(scans) == 2
+    assert [row.value for row in capture.candidates] == [315.0, 315.0, 320.0]
+
+
+@pytest.mark.asyncio
+async def test_capture_response_body_keeps_only_latest_candidates() -> None:
+    class _FakeResponse:
+        url = "https://www.trendevice.com/api/valutazione"
+        status = 200
+        headers = {"content-type": "application/json"}
+
+        def __init__(self, amount: int) -> None:
+            self.amount = amount
+
+        async def body(self) -> bytes:
+            return json.dumps({"valutazione": {"offerta": {"amount": self.amount}}}).encode()
+
+    capture = trenddevice.ResponseCaptureState()
+    for amount in range(100, 100 + trenddevice.NETWORK_CANDIDATES_LIMIT + 5):
+        await trenddevice._capture_response_body(_FakeResponse(amount), capture)
+    assert len(capture.candidates) == trenddevice.NETWORK_CANDIDATES_LIMIT
+    assert capture.candidates[0].value == 105.0
+    assert capture.candidates[-1].value == 144.0
+
+
+@pytest.mark.asyncio
+async def test_save_session_state_writes_context_state_atomically(tmp_path) -> None:  # noqa: ANN001
+    class _FakeContext:
+        async def storage_state(self) -> dict:
+            return {"cookies": [{"name": "consent", "value": "1"}], "origins": []}
+
+    target = tmp_path / "session.json"
+    await trenddevice._save_session_state(_FakeContext(), str(target))
+    assert json.loads(target.read_text(encoding="utf-8"))["cookies"][0]["name"] == "consent"
+    assert [item.name for item in tmp_path.iterdir()] == ["session.json"]
+    assert target.stat().st_mode & 0o777 == 0o600
+
+
+def test_session_state_path_disabled_with_storage_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TRENDDEVICE_USE_STORAGE_STATE", "false")
+    assert trenddevice._session_state_path() is None
+    monkeypatch.setenv("TRENDDEVICE_USE_STORAGE_STATE", "true")
+    monkeypatch.delenv("TRENDDEVICE_SESSION_STATE_PATH", raising=False)
+    assert trenddevice._session_state_path() is None
+    monkeypatch.setenv("TRENDDEVICE_SESSION_STATE_PATH", "/tmp/td-session.json")
+    assert trenddevice._session_state_path() == "/tmp/td-session.json"
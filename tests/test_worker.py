@@ -1098,6 +1098,26 @@ async def test_run_worker_defaults_to_scan(monkeypatch: pytest.MonkeyPatch) -> N
     assert called["scan"] is True
 
 
+@pytest.mark.asyncio
+async def test_run_worker_closes_trenddevice_resources_on_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    closed = []
+
+    async def fake_scan(payload):  # noqa: ANN001
+        raise RuntimeError("boom")
+
+    async def fake_aclose() -> None:
+        closed.append(True)
+
+    monkeypatch.setattr("tech_sniper_it.worker.load_dotenv", lambda: None)
+    monkeypatch.setattr("tech_sniper_it.worker._load_github_event_data", lambda: {})
+    monkeypatch.setattr("tech_sniper_it.worker._run_scan_command", fake_scan)
+    monkeypatch.setattr("tech_sniper_it.worker.TrendDeviceValuator.aclose", fake_aclose)
+
+    with pytest.raises(RuntimeError):
+        await run_worker()
+    assert closed == [True]
+
+
 @pytest.mark.asyncio
 async def test_send_telegram_message_splits_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
     sent = []